@@ -0,0 +1,888 @@
+"""Opt-in asyncio entry point: ``python async_main.py`` instead of ``python main.py``.
+
+The handlers mirror main.py but run on ``AsyncApp``/``AsyncWebClient`` and the
+async SQLAlchemy engine from includes/async_db.py, so a slow Slack or database
+round trip no longer pins one of Bolt's worker threads.
+"""
+import asyncio
+import datetime
+import logging
+import os
+import re
+import time
+from typing import List, Optional
+
+from dotenv import load_dotenv
+from slack_bolt import BoltResponse
+from slack_bolt.async_app import AsyncApp
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry.builtin_async_handlers import AsyncRateLimitErrorRetryHandler
+
+from includes import async_db, custom_blocks, dedup, dispatcher, export, metrics, scheduler, user_profiles, utils
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s %(levelname)s: %(message)s',
+    handlers=[
+        logging.FileHandler('app.log'),
+        logging.StreamHandler()
+    ]
+)
+
+load_dotenv()
+
+app = AsyncApp(
+    token=os.environ.get("SLACK_BOT_TOKEN"),
+    signing_secret=os.environ.get("SLACK_SIGNING_SECRET")
+)
+
+# On HTTP 429 wait out Slack's Retry-After and try again. This covers the calls listeners
+# make directly (views.open, users.info, ...); messages go through the outbox below.
+app.client.retry_handlers.append(AsyncRateLimitErrorRetryHandler(max_retry_count=2))
+
+# Slack retries a request that is not acknowledged within 3 seconds; warn well before that
+ACK_WARNING_SECONDS = 2.5
+
+
+@app.middleware
+async def stamp_received_at(context, next):
+    context["received_at"] = time.perf_counter()
+    await next()
+
+
+@app.middleware
+async def skip_duplicate_deliveries(body, request, next):
+    """Answer Slack retries and duplicate deliveries without running any listener"""
+    key = dedup.get_delivery_key(body)
+    if key and not request.lazy_only and not await dedup.async_claim(key):
+        retry_num = request.headers.get("x-slack-retry-num", ["0"])[0]
+        logging.info(f"Skipping duplicate delivery {key} (retry {retry_num})")
+        metrics.increment("dedup.skipped")
+        return BoltResponse(status=200, body="")
+    await next()
+
+
+async def acknowledge(ack, body, context):
+    """Ack-only listener shared by every command, shortcut, view and action; see main.acknowledge"""
+    await ack()
+    name = utils.get_listener_name(body)
+    latency = time.perf_counter() - context["received_at"]
+    metrics.observe(f"ack.{name}", latency)
+    if latency > ACK_WARNING_SECONDS:
+        logging.warning(f"Slow ack for {name}: {latency:.3f}s")
+
+
+# Messages are queued and sent by background tasks within Slack's rate limits; see main.outbox
+outbox = dispatcher.AsyncMessageDispatcher(AsyncWebClient(token=os.environ.get("SLACK_BOT_TOKEN")))
+
+
+async def post_to_general(client, text: str, blocks: Optional[List[dict]] = None, wait_for_room: bool = False,
+                          on_sent=None) -> bool:
+    """Queue a message for #debits-general; return whether it was queued. ``client`` is not used.
+
+    Scheduled and system messages pass ``wait_for_room`` so a full queue holds them instead of dropping them.
+    ``on_sent`` is called with the response once the message has been posted.
+    """
+    message_payload = {
+        "text": text,
+    }
+    if blocks:
+        message_payload["blocks"] = blocks
+
+    return await outbox.enqueue("chat_postMessage", "debits-general", wait_for_room=wait_for_room, on_sent=on_sent,
+                                **message_payload)
+
+
+async def post_to_channel(client, channel_id: str, text: str, blocks: Optional[List[dict]] = None) -> bool:
+    """Queue a message for ``channel_id``, falling back to #debits-general if it cannot be posted"""
+    message_payload = {
+        "text": text,
+    }
+    if blocks:
+        message_payload["blocks"] = blocks
+
+    async def post_to_general_instead(error):
+        await post_to_general(client, text, blocks)
+
+    return await outbox.enqueue("chat_postMessage", channel_id, on_error=post_to_general_instead, **message_payload)
+
+
+async def is_workspace_admin(client, user_id):
+    try:
+        return utils.is_admin_profile(await user_profiles.async_get_user_profile(client, user_id))
+    except Exception as e:
+        print(f"Error checking workspace admin status: {e}")
+        return False
+
+
+async def get_permalink(client, channel, timestamp):
+    response = await client.chat_getPermalink(
+        channel=channel,
+        message_ts=timestamp
+    )
+    return response["permalink"]
+
+
+@app.event("message")
+async def handle_message_events(body, logger):
+    logger.info(body)
+
+
+async def handle_user_profile_event(body):
+    """Refresh the cached profile whenever Slack reports a changed or newly joined user"""
+    user_profiles.remember(body["event"]["user"])
+
+
+app.event("user_change")(ack=acknowledge, lazy=[handle_user_profile_event])
+app.event("team_join")(ack=acknowledge, lazy=[handle_user_profile_event])
+
+
+async def handle_app_mention(body, say):
+    block = custom_blocks.get_app_mention_block()
+    await say(blocks=block, text="Intro message")
+
+
+app.event("app_mention")(ack=acknowledge, lazy=[handle_app_mention])
+
+
+async def handle_add_point_command(body, client):
+    text = body["text"]
+    try:
+        entries = utils.parse_input(text)
+        workspace_id = utils.get_workspace(body)
+
+        # Every pair goes through one bulk upsert and is reported in one message
+        results = await async_db.record_debits(workspace_id, entries, actor=body["user_id"])
+        blocks = custom_blocks.points_summary_blocks(results)
+        await post_to_general(client, utils.points_summary_text(results), blocks)
+    except ValueError as e:
+        # Return a helpful error message to the user
+        error_message = f"Error: {str(e)}"
+        await post_to_general(client, error_message)
+
+
+app.command("/add")(ack=acknowledge, lazy=[handle_add_point_command])
+
+
+async def handle_remove_point_command(body, client):
+    text = body["text"]
+    try:
+        entries = utils.parse_input(text)
+        workspace_id = utils.get_workspace(body)
+
+        results = await async_db.remove_debits(workspace_id, entries, actor=body["user_id"])
+        blocks = custom_blocks.points_summary_blocks(results, removed=True)
+        await post_to_general(client, utils.points_summary_text(results, removed=True), blocks)
+    except ValueError as e:
+        await post_to_general(client, f"Error: {str(e)}")
+
+
+app.command("/delete")(ack=acknowledge, lazy=[handle_remove_point_command])
+
+
+async def get_leaderboard_page(workspace_id: str, cursor: Optional[str] = None,
+                               page_size: int = custom_blocks.LEADERBOARD_PAGE_SIZE):
+    """Fetch one leaderboard page; returns its rows, the rank of the first row and the next cursor"""
+    start_rank = utils.parse_leaderboard_cursor(cursor)
+    user_points = await async_db.get_leaderboard(workspace_id, page_size + 1, start_rank - 1)
+    user_points, next_page = utils.split_leaderboard_page(user_points, page_size, start_rank)
+    return user_points, start_rank, next_page
+
+
+async def handle_points_command(client, body):
+    text = body["text"]
+    workspace_id = utils.get_workspace(body)
+    if text:
+        user_id = text.strip().replace("@", "")
+        ranked = await async_db.get_user_rank(user_id, workspace_id)
+        if ranked:
+            response_text = f"<@{ranked.user}>: {int(ranked.amount)} (rank {ranked.rank})"
+        else:
+            response_text = f"<@{user_id}> has no points yet."
+        await post_to_general(client, response_text)
+
+    else:
+        user_points, start_rank, next_page = await get_leaderboard_page(workspace_id)
+        if user_points:
+            blocks = custom_blocks.user_points_blocks(user_points, start_rank, next_page)
+            await post_to_general(client, "Debit Points", blocks)
+
+        else:
+            await post_to_general(client, "No user points found in the database.")
+
+
+app.command("/points")(ack=acknowledge, lazy=[handle_points_command])
+
+
+async def handle_add_a_point_shortcut(body, client):
+    timestamp = body["message"]["ts"]
+    channel_id = body["channel"]["id"]
+    trigger_id = body["trigger_id"]
+    link = await get_permalink(client, channel_id, timestamp)
+    blocks = custom_blocks.points_modal(link, request_type="add_modal_save")
+    await client.views_open(trigger_id=trigger_id, view=blocks)
+
+
+app.shortcut("add_point")(ack=acknowledge, lazy=[handle_add_a_point_shortcut])
+
+
+async def handle_remove_point_shortcut(body, client):
+    timestamp = body["message"]["ts"]
+    channel_id = body["channel"]["id"]
+    trigger_id = body["trigger_id"]
+    link = await get_permalink(client, channel_id, timestamp)
+    blocks = custom_blocks.points_modal(link, request_type="remove_modal_save")
+    await client.views_open(trigger_id=trigger_id, view=blocks)
+
+
+app.shortcut("remove_point")(ack=acknowledge, lazy=[handle_remove_point_shortcut])
+
+
+async def handle_remove_submission_events(body, client):
+    workspace_id = utils.get_workspace(body)
+    selected_users = body["view"]["state"]["values"]["user"]["multi_users_select-action"]["selected_users"]
+    usernames = [(await user_profiles.async_get_user_profile(client, user_id))["name"] for user_id in selected_users]
+    points = body["view"]["state"]["values"]["points"]["plain_text_input-action"]["value"]
+    timestamp_link = body["view"]["state"]["values"]["timestamp"]["timestamp_input"]["value"]
+    results = await async_db.remove_debits(
+        workspace_id, [(username, int(points)) for username in usernames], timestamp_link, actor=body["user"]["id"]
+    )
+    blocks = custom_blocks.points_summary_blocks(results, removed=True, link=timestamp_link)
+    text = utils.points_summary_text(results, removed=True)
+    await post_to_general(client, text, blocks)
+
+
+app.view("remove_modal_save")(ack=acknowledge, lazy=[handle_remove_submission_events])
+
+
+async def handle_add_submission_events(body, client):
+    workspace_id = utils.get_workspace(body)
+    selected_users = body["view"]["state"]["values"]["user"]["multi_users_select-action"]["selected_users"]
+    usernames = [(await user_profiles.async_get_user_profile(client, user_id))["name"] for user_id in selected_users]
+    points = body["view"]["state"]["values"]["points"]["plain_text_input-action"]["value"]
+    timestamp_link = body["view"]["state"]["values"]["timestamp"]["timestamp_input"]["value"]
+    results = await async_db.record_debits(
+        workspace_id, [(username, int(points)) for username in usernames], timestamp_link, actor=body["user"]["id"]
+    )
+    blocks = custom_blocks.points_summary_blocks(results, link=timestamp_link)
+    text = utils.points_summary_text(results)
+    await post_to_general(client, text, blocks)
+
+
+app.view("add_modal_save")(ack=acknowledge, lazy=[handle_add_submission_events])
+
+
+async def handle_all_points_shortcut(body, client):
+    workspace_id = utils.get_workspace(body)
+    user_points, start_rank, next_page = await get_leaderboard_page(workspace_id)
+    if user_points:
+        blocks = custom_blocks.user_points_blocks(user_points, start_rank, next_page)
+        await post_to_general(client, "Debit Points", blocks)
+    else:
+        await post_to_general(client, "No user points found in the database.")
+
+
+app.shortcut("all_points")(ack=acknowledge, lazy=[handle_all_points_shortcut])
+
+
+async def handle_leaderboard_page(body, client):
+    workspace_id = utils.get_workspace(body)
+    cursor = body["actions"][0]["value"]
+    user_points, start_rank, next_page = await get_leaderboard_page(workspace_id, cursor)
+    if user_points:
+        channel_id = body["channel"]["id"]
+        message_ts = body["message"]["ts"]
+        # Queued like every other message; clicking through pages quickly only sends the last one
+        await outbox.enqueue(
+            "chat_update",
+            channel_id,
+            coalesce_key=("chat_update", channel_id, message_ts),
+            ts=message_ts,
+            text="Debit Points",
+            blocks=custom_blocks.user_points_blocks(user_points, start_rank, next_page)
+        )
+
+
+app.action(re.compile("leaderboard_(first|next)_page"))(ack=acknowledge, lazy=[handle_leaderboard_page])
+
+
+async def handle_set_reset_mode(body, respond):
+    workspace_id = utils.get_workspace(body)
+    mode = body["text"].strip().lower()
+    if mode in ["automatic", "manual"]:
+        await async_db.set_reset_mode(workspace_id, mode)
+        await respond(f"Reset mode set to {mode}.")
+    else:
+        await respond("Invalid mode. Please enter 'automatic' or 'manual'.")
+
+
+app.command("/set-reset-mode")(ack=acknowledge, lazy=[handle_set_reset_mode])
+
+
+async def handle_reset_command(body, client, respond):
+    user_id = utils.get_user_id(body, "body")
+    if await is_workspace_admin(client, user_id):
+        trigger_id = body["trigger_id"]
+        blocks = custom_blocks.reset_db_modal_blocks()
+        await client.views_open(trigger_id=trigger_id, view=blocks)
+    else:
+        await respond("Command reserved for admin")
+
+
+app.command("/reset")(ack=acknowledge, lazy=[handle_reset_command])
+
+
+async def handle_export_command(body, client, respond):
+    """Upload a workspace's debits, ledger or checklist history as CSV or NDJSON files"""
+    user_id = utils.get_user_id(body, "body")
+    if not await is_workspace_admin(client, user_id):
+        await respond("Command reserved for admin")
+        return
+    try:
+        dataset, fmt = export.parse_command(body["text"])
+    except ValueError as e:
+        await respond(f"Error: {str(e)}")
+        return
+
+    workspace_id = utils.get_workspace(body)
+    # Parts are read on a worker thread, one at a time, so the loop is never blocked
+    export_parts = export.iter_export(dataset, workspace_id, fmt)
+    parts = 0
+    try:
+        while (content := await asyncio.to_thread(next, export_parts, None)) is not None:
+            parts += 1
+            await client.files_upload_v2(
+                channel=body["channel_id"],
+                content=content,
+                filename=export.filename(dataset, workspace_id, fmt, parts),
+                title=f"{dataset} export, part {parts}",
+            )
+    except SlackApiError as e:
+        logging.error(f"Error uploading {dataset} export: {e.response['error']}")
+        await respond(f"The {dataset} export could not be uploaded.")
+        return
+    finally:
+        export_parts.close()
+    if not parts:
+        await respond(f"There is no {dataset} data to export.")
+
+
+app.command("/export")(ack=acknowledge, lazy=[handle_export_command])
+
+
+async def handle_create_checklist_command(body, client):
+    """Command handler for /create-checklist"""
+    trigger_id = body["trigger_id"]
+    blocks = custom_blocks.create_checklist_modal()
+    await client.views_open(trigger_id=trigger_id, view=blocks)
+
+
+app.command("/create-checklist")(ack=acknowledge, lazy=[handle_create_checklist_command])
+
+
+async def handle_create_checklist_shortcut(body, client):
+    """Global shortcut handler to open the create checklist modal"""
+    trigger_id = body["trigger_id"]
+    blocks = custom_blocks.create_checklist_modal()
+    await client.views_open(trigger_id=trigger_id, view=blocks)
+
+
+app.shortcut("open_create_checklist")(ack=acknowledge, lazy=[handle_create_checklist_shortcut])
+
+
+async def handle_view_checklists_shortcut(body, client):
+    """Global shortcut handler to view all checklists"""
+    workspace_id = utils.get_workspace(body)
+    checklists = await async_db.get_all_checklists(workspace_id)
+    modal = custom_blocks.view_checklists_modal(checklists)
+    await client.views_open(trigger_id=body["trigger_id"], view=modal)
+
+
+app.shortcut("view_checklists")(ack=acknowledge, lazy=[handle_view_checklists_shortcut])
+
+
+async def handle_create_checklist_submission(body, client):
+    """Handle submission of the create checklist modal"""
+    # Extract the values
+    checklist_name = body["view"]["state"]["values"]["checklist_name"]["checklist_name_input"]["value"]
+    items_text = body["view"]["state"]["values"]["checklist_items"]["checklist_items_input"]["value"]
+    items = [item.strip() for item in items_text.split("\n") if item.strip()]
+
+    # Get user and workspace info
+    user_id = body["user"]["id"]
+    workspace_id = utils.get_workspace(body)
+
+    # Create the checklist
+    success = await async_db.create_checklist(checklist_name, workspace_id, user_id, items)
+    # Send a confirmation message to the user
+    if success:
+        text = f"Checklist '{checklist_name}' created successfully! Use `/checklist {checklist_name}` to use it."
+    else:
+        text = f"Error creating checklist '{checklist_name}'. Please try again."
+    try:
+        await client.chat_postEphemeral(channel=user_id, user=user_id, text=text)
+    except Exception as e:
+        logging.error(f"Error sending checklist creation result: {e}")
+
+
+app.view("create_checklist")(ack=acknowledge, lazy=[handle_create_checklist_submission])
+
+
+async def handle_checklist_command(body, client, say):
+    """Command handler for /checklist"""
+    channel_id = body["channel_id"]
+    workspace_id = utils.get_workspace(body)
+    command_text = body["text"].strip()
+
+    # Parse checklist name and mentioned users
+    parts = command_text.split()
+    checklist_name = parts[0] if parts else ""
+    mentioned_users = [part for part in parts[1:] if part.startswith('@')]
+
+    if not checklist_name:
+        # If no name provided, list all available checklists
+        checklists = await async_db.get_all_checklists(workspace_id)
+        blocks = custom_blocks.list_checklists_blocks(checklists)
+        await say(blocks=blocks, text="Available Checklists")
+        return
+
+    # Get the checklist by name
+    checklist = await async_db.get_checklist_by_name(checklist_name, workspace_id)
+    if not checklist:
+        await say(f"Checklist '{checklist_name}' not found. Use `/checklist` to see available checklists.")
+        return
+
+    # Create the checklist instance before posting
+    instance_id = await async_db.create_checklist_instance(checklist["id"], channel_id, "temp")
+    if not instance_id:
+        await say("Error creating checklist instance. Please try again.")
+        return
+
+    instance_data = await async_db.get_checklist_instance(instance_id)
+    if not instance_data:
+        await say("Error retrieving checklist instance data.")
+        return
+
+    # Post the checklist message
+    response = await client.chat_postMessage(
+        channel=channel_id,
+        blocks=custom_blocks.render_checklist_instance(instance_data),
+        text=f"Checklist: {checklist_name}"
+    )
+
+    # Update the instance with the real message timestamp
+    if response["ok"]:
+        await async_db.set_checklist_instance_message_ts(instance_id, response["ts"])
+
+        # Notify mentioned users concurrently
+        async def notify(user):
+            try:
+                await client.chat_postEphemeral(
+                    channel=channel_id,
+                    user=user.strip('@'),
+                    text=f"You've been mentioned in checklist '{checklist_name}'. Check it out in this channel!"
+                )
+            except Exception as e:
+                logging.error(f"Error notifying user {user}: {e}")
+
+        await asyncio.gather(*(notify(user) for user in mentioned_users))
+
+
+app.command("/checklist")(ack=acknowledge, lazy=[handle_checklist_command])
+
+
+async def handle_view_checklist_button(body, client):
+    """Handle clicks on the view button for checklist listings"""
+    action = body.get("actions", [{}])[0]
+    checklist_name = action.get("value")
+    user_id = body.get("user", {}).get("id")
+    workspace_id = utils.get_workspace(body)
+    container_type = body.get("container", {}).get("type")
+    channel_id = body.get("channel", {}).get("id")
+
+    if not all([checklist_name, user_id, workspace_id]):
+        logging.error("Missing mandatory data in view checklist action payload")
+        return
+
+    # When launched from the modal, there is no channel in the payload.
+    # Open a direct message with the user so we can share the checklist instance there.
+    if not channel_id and container_type == "view":
+        try:
+            dm_response = await client.conversations_open(users=user_id)
+            channel_id = dm_response.get("channel", {}).get("id")
+        except SlackApiError as e:
+            logging.error(f"Unable to open DM for checklist preview: {e.response['error'] if e.response else e}")
+            return
+
+    if not channel_id:
+        logging.error("Unable to determine a destination channel for the checklist view action")
+        return
+
+    async def notify_user(message: str):
+        try:
+            if container_type == "view":
+                await client.chat_postMessage(channel=channel_id, text=message)
+            else:
+                await client.chat_postEphemeral(channel=channel_id, user=user_id, text=message)
+        except SlackApiError as e:
+            logging.error(f"Failed to notify user about checklist view error: {e.response['error'] if e.response else e}")
+
+    checklist = await async_db.get_checklist_by_name(checklist_name, workspace_id)
+    if not checklist:
+        await notify_user(f"Checklist '{checklist_name}' was not found. It may have been deleted.")
+        return
+
+    instance_id = await async_db.create_checklist_instance(checklist["id"], channel_id, "temp")
+    if not instance_id:
+        await notify_user("Unable to create checklist instance. Please try again later.")
+        return
+
+    instance_data = await async_db.get_checklist_instance(instance_id)
+    if not instance_data:
+        await notify_user("Unable to load the checklist. Please try again later.")
+        return
+
+    response = await client.chat_postMessage(
+        channel=channel_id,
+        blocks=custom_blocks.render_checklist_instance(instance_data),
+        text=f"Checklist: {checklist_name}"
+    )
+
+    if response.get("ok"):
+        message_ts = response.get("ts")
+        if message_ts:
+            await async_db.set_checklist_instance_message_ts(instance_id, message_ts)
+    else:
+        await notify_user("Failed to post the checklist to the channel.")
+
+
+app.action("view_checklist_button")(ack=acknowledge, lazy=[handle_view_checklist_button])
+
+
+async def handle_delete_checklist_command(body, client):
+    """Command handler for /delete-checklist"""
+    workspace_id = utils.get_workspace(body)
+    user_id = utils.get_user_id(body, "body")
+
+    # Get all available checklists
+    checklists = await async_db.get_all_checklists(workspace_id)
+    if not checklists:
+        await client.chat_postEphemeral(
+            channel=body["channel_id"],
+            user=user_id,
+            text="No checklists found to delete."
+        )
+        return
+
+    # Show the delete modal
+    blocks = custom_blocks.delete_checklist_modal(checklists)
+    await client.views_open(trigger_id=body["trigger_id"], view=blocks)
+
+
+app.command("/delete-checklist")(ack=acknowledge, lazy=[handle_delete_checklist_command])
+
+
+# Checkbox clicks within this window are rendered by a single chat.update
+CHECKLIST_UPDATE_DEBOUNCE_SECONDS = 1.0
+
+
+async def handle_item_toggle(body, client):
+    """Handle checkbox actions for checklist items"""
+    try:
+        # Extract action details
+        action_id = body["actions"][0]["action_id"]
+        selected = len(body["actions"][0]["selected_options"]) > 0
+        parts = action_id.split("_")
+
+        if len(parts) < 4:
+            logging.error(f"Invalid action format: {action_id}")
+            return
+
+        item_id = parts[2]
+        instance_id = parts[3]
+        user_id = body["user"]["id"]
+
+        # Update the item status; the updated instance comes back ready to render
+        instance_data = await async_db.update_checklist_item(int(instance_id), int(item_id), selected, user_id)
+        if not instance_data:
+            logging.error(f"Failed to update checklist item {item_id} of instance {instance_id}")
+            return
+
+        created_at = custom_blocks.format_timestamp(instance_data.get('created_at'))
+        completed_at = custom_blocks.format_timestamp(instance_data.get('completed_at'))
+
+        # Calculate time taken if both timestamps exist
+        time_str = "Time information not available"
+        if instance_data.get('created_at') and instance_data.get('completed_at'):
+            try:
+                time_str = utils.format_time_difference(instance_data['created_at'], instance_data['completed_at'])
+            except (ValueError, TypeError):
+                pass
+
+        channel_id = body["channel"]["id"]
+        message_ts = body["message"]["ts"]
+
+        async def render_update():
+            # Rendered when the update is sent, so the last one always shows the latest state
+            latest = await async_db.get_checklist_instance(int(instance_id)) or instance_data
+            return {
+                "blocks": custom_blocks.render_checklist_instance(latest),
+                "text": f"Checklist: {latest.get('name', 'Unnamed Checklist')}"
+            }
+
+        # Update the checklist message; rapid clicks on one message collapse into one update
+        await outbox.enqueue(
+            "chat_update",
+            channel_id,
+            coalesce_key=("chat_update", channel_id, message_ts),
+            delay=CHECKLIST_UPDATE_DEBOUNCE_SECONDS,
+            render=render_update,
+            ts=message_ts
+        )
+
+        # Send completion message if all items are complete
+        if selected and instance_data["is_complete"]:
+            completion_blocks = custom_blocks.checklist_completed_blocks(
+                instance_data.get('name', 'Unnamed Checklist'), time_str, created_at, completed_at
+            )
+
+            # Queued behind the checklist update for the same channel, so it is posted after it
+            await outbox.enqueue(
+                "chat_postMessage",
+                channel_id,
+                blocks=completion_blocks,
+                text=f"Checklist completed in {time_str}!"
+            )
+
+    except Exception as e:
+        logging.error(f"Error in handle_item_toggle: {e}")
+
+
+app.action(re.compile("toggle_item_(.*)"))(ack=acknowledge, lazy=[handle_item_toggle])
+
+
+async def handle_delete_checklist_submission(body, client):
+    """Handle submission of the delete checklist modal"""
+    # Extract the values
+    selected_checklist = body["view"]["state"]["values"]["checklist_select"]["checklist_select_action"]["selected_option"]["value"]
+    workspace_id = utils.get_workspace(body)
+    user_id = body["user"]["id"]
+
+    # Delete the checklist
+    success = await async_db.delete_checklist(selected_checklist, workspace_id)
+    # Send a confirmation message to the user
+    if success:
+        text = f"Checklist '{selected_checklist}' deleted successfully!"
+    else:
+        text = f"Error deleting checklist '{selected_checklist}'. Please try again."
+    try:
+        await client.chat_postEphemeral(channel=user_id, user=user_id, text=text)
+    except Exception as e:
+        logging.error(f"Error sending checklist deletion result: {e}")
+
+
+app.view("delete_checklist")(ack=acknowledge, lazy=[handle_delete_checklist_submission])
+
+
+async def handle_reset_view(body, client):
+    workspace_id = utils.get_workspace(body)
+    await async_db.reset_debits_table(workspace_id, actor=body["user"]["id"])
+    await post_to_general(client, "The database was successfully reset.")
+
+
+app.view("reset")(ack=acknowledge, lazy=[handle_reset_view])
+
+
+async def handle_set_report_day(body, respond):
+    workspace_id = utils.get_workspace(body)
+    text = body["text"].strip().lower()
+
+    try:
+        day, time_hour = text.split()
+        time_hour = int(time_hour)
+        valid_days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+        if day in valid_days:
+            if 0 <= time_hour < 24:
+                await async_db.set_report_daytime(workspace_id, day, time_hour)
+                schedule_weekly_report(workspace_id, day, time_hour)
+                await respond(f"Weekly report day set to {day.capitalize()} at {time_hour:02d}:00.")
+            else:
+                await respond("Invalid time. Please enter a valid hour (0-23).")
+        else:
+            await respond("Invalid day. Please enter a valid day of the week.")
+    except ValueError:
+        await respond("Invalid input. Please provide the day and time in the format 'day hour'.")
+    except Exception as e:
+        await respond(f"An error occurred: {e}. Please try again later.")
+
+
+app.command("/set-report-day")(ack=acknowledge, lazy=[handle_set_report_day])
+
+
+async def send_weekly_report(workspace_id: str, on_sent=None) -> bool:
+    """Queue the workspace's report, one message per page; return False if it has to be sent again.
+
+    ``on_sent`` is called once the last page has been posted.
+    """
+    user_points, start_rank, next_page = await get_leaderboard_page(workspace_id, page_size=custom_blocks.REPORT_PAGE_SIZE)
+    if not user_points:
+        logging.error("No user points found in the database")
+        return True
+
+    # One message per page; large workspaces get several consecutive messages
+    try:
+        blocks = custom_blocks.user_points_blocks(user_points, start_rank)
+        if not await post_to_general(app.client, "Weekly Debit Points Update", blocks, wait_for_room=True,
+                                     on_sent=None if next_page else on_sent):
+            return False
+        while next_page:
+            user_points, start_rank, next_page = await get_leaderboard_page(
+                workspace_id, next_page, custom_blocks.REPORT_PAGE_SIZE)
+            if not user_points:
+                break
+            blocks = custom_blocks.user_points_blocks(user_points, start_rank, header=False)
+            if not await post_to_general(app.client, "Weekly Debit Points Update (continued)", blocks,
+                                         wait_for_room=True, on_sent=None if next_page else on_sent):
+                return False
+    except Exception as e:
+        logging.error(f"Error sending weekly report: {e}")
+        return False
+    return True
+
+
+# Jobs that fall due together (e.g. every report set for the same hour) run on this many workers
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", 8))
+# A report that could not be queued is tried again this much later, while its hour lasts
+REPORT_RETRY_SECONDS = 300
+
+job_scheduler = scheduler.AsyncScheduler(max_concurrency=REPORT_WORKERS)
+
+# Reload every schedule this often so changes made through another process are picked up
+SCHEDULE_REFRESH_SECONDS = 900
+
+# Log the counters, timings and cache stats of includes.metrics this often
+METRICS_LOG_SECONDS = int(os.environ.get("METRICS_LOG_SECONDS", 300))
+
+# Last (day, hour) armed per workspace
+report_schedules = {}
+
+
+def schedule_weekly_report(workspace_id: str, day: str, hour: int, now: Optional[datetime.datetime] = None):
+    """Arm (or re-arm) the workspace's next weekly report; the scheduler wakes up immediately"""
+    run_at = scheduler.next_weekly_run(day, hour, now or datetime.datetime.now())
+    report_schedules[workspace_id] = (day, hour)
+    job_scheduler.schedule(f"report:{workspace_id}", run_at, lambda: run_weekly_report(workspace_id, day, hour))
+
+
+async def run_weekly_report(workspace_id: str, day: str, hour: int):
+    now = datetime.datetime.now()
+    # An hour from now is past this week's slot, so the job is re-armed for next week
+    next_week = now + datetime.timedelta(hours=1)
+
+    week = scheduler.week_key(now)
+    if await async_db.claim_weekly_report(workspace_id, day, hour, week):
+        started = time.perf_counter()
+
+        def report_posted(response):
+            # Timed until Slack has the last page, including the wait in the outbox
+            metrics.observe("report.workspace", time.perf_counter() - started)
+
+        sent = await send_weekly_report(workspace_id, on_sent=report_posted)
+        if sent:
+            schedule_weekly_report(workspace_id, day, hour, next_week)
+        else:
+            # Give the week back so this or another process can send it
+            metrics.increment("report.failed")
+            await async_db.release_weekly_report(workspace_id, week)
+            schedule_weekly_report(workspace_id, day, hour, now + datetime.timedelta(seconds=REPORT_RETRY_SECONDS))
+        return
+
+    # Already sent this week, or the schedule was changed through another process
+    report_schedule = await async_db.get_report_schedule(workspace_id)
+    if report_schedule is None:
+        report_schedules.pop(workspace_id, None)
+    elif (report_schedule.day, report_schedule.hour) == (day, hour):
+        schedule_weekly_report(workspace_id, day, hour, next_week)
+    else:
+        schedule_weekly_report(workspace_id, report_schedule.day, report_schedule.hour)
+
+
+async def refresh_report_schedules():
+    run_at = datetime.datetime.now() + datetime.timedelta(seconds=SCHEDULE_REFRESH_SECONDS)
+    job_scheduler.schedule("refresh_report_schedules", run_at, refresh_report_schedules)
+
+    reports_daytime = await async_db.get_report_daytime()
+    if reports_daytime:
+        for report_daytime in reports_daytime:
+            workspace_id = report_daytime.workspace
+            changed = report_schedules.get(workspace_id) != (report_daytime.day, report_daytime.hour)
+            if changed or job_scheduler.next_run(f"report:{workspace_id}") is None:
+                schedule_weekly_report(workspace_id, report_daytime.day, report_daytime.hour)
+    else:
+        logging.info('No report in database')
+
+
+async def check_reset_mode():
+    """Reset every automatic workspace once per month, catching up on months missed while down"""
+    period = scheduler.month_key(datetime.datetime.now())
+    reset_modes = await async_db.get_reset_mode()
+
+    if reset_modes:
+        for reset_mode in reset_modes:
+            workspace_id = reset_mode.workspace
+            if reset_mode.reset_mode == "automatic" and await async_db.reset_debits_for_period(workspace_id, period):
+                await post_to_general(app.client, "Database Reset Successful", wait_for_room=True)
+                logging.info(f"Automatic reset performed for workspace {workspace_id}")
+    else:
+        logging.info('No mode in database')
+
+
+def schedule_reset_check(run_at: Optional[datetime.datetime] = None):
+    """Run check_reset_mode at ``run_at`` and from then on every day at 00:01"""
+    if run_at is None:
+        now = datetime.datetime.now()
+        run_at = now.replace(hour=0, minute=1, second=0, microsecond=0)
+        if run_at <= now:
+            run_at += datetime.timedelta(days=1)
+
+    async def job():
+        schedule_reset_check()
+        await check_reset_mode()
+
+    job_scheduler.schedule("reset_check", run_at, job)
+
+
+async def log_metrics():
+    run_at = datetime.datetime.now() + datetime.timedelta(seconds=METRICS_LOG_SECONDS)
+    job_scheduler.schedule("log_metrics", run_at, log_metrics)
+    logging.info("Metrics:\n" + metrics.format_snapshot(metrics.snapshot()))
+
+
+async def run_scheduler():
+    """Async counterpart of main.run_scheduler, running on the server's event loop"""
+    job_scheduler.schedule("refresh_report_schedules", datetime.datetime.now(), refresh_report_schedules)
+    # Check straight away so a reset missed while the app was down is caught up
+    schedule_reset_check(datetime.datetime.now())
+    job_scheduler.schedule("log_metrics", datetime.datetime.now() + datetime.timedelta(seconds=METRICS_LOG_SECONDS),
+                           log_metrics)
+    await job_scheduler.run_forever()
+
+
+async def start_scheduler(web_app):
+    web_app["scheduler"] = asyncio.create_task(run_scheduler())
+
+
+async def stop_scheduler(web_app):
+    web_app["scheduler"].cancel()
+    await outbox.flush(timeout=10)
+    await outbox.close()
+    await async_db.async_engine.dispose()
+
+
+if __name__ == "__main__":
+    server = app.server(port=int(os.environ.get("PORT", 3000)))
+    server.web_app.on_startup.append(start_scheduler)
+    server.web_app.on_cleanup.append(stop_scheduler)
+    server.start()
@@ -0,0 +1,23 @@
+"""Ad hoc performance benchmarks; run one with ``python -m benchmarks.<name>`` from the repo root.
+
+They are not part of the test suite. Each run uses a fresh SQLite file in a temporary
+directory unless ``SQLITE_PATH`` or ``DATABASE_URL`` is already set.
+"""
+import importlib
+import os
+import tempfile
+
+TEMP_DIR = tempfile.mkdtemp(prefix="debits-bench-")
+
+if not os.environ.get("DATABASE_URL") and not os.environ.get("SQLITE_PATH"):
+    os.environ["SQLITE_PATH"] = os.path.join(TEMP_DIR, "bench.db")
+
+
+def import_app(name):
+    """Import main or async_main with the working directory in TEMP_DIR, so their app.log lands there"""
+    cwd = os.getcwd()
+    os.chdir(TEMP_DIR)
+    try:
+        return importlib.import_module(name)
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,128 @@
+"""Concurrent request capacity of main.py (App, threads) against async_main.py (AsyncApp, asyncio).
+
+    python -m benchmarks.async_load [--requests 200] [--latency 0.1]
+
+Both apps receive the same burst of signed ``/checklist`` commands. Each one reads the
+template, creates an instance, posts it with chat.postMessage and records its ts, so
+every request holds one Web API call; the fake Web API answers after ``--latency``
+seconds. Reported: time until every checklist was posted, and the per-request latency.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+os.environ.setdefault("SLACK_BOT_TOKEN", "xoxb-bench")
+os.environ.setdefault("SLACK_SIGNING_SECRET", "bench-secret")
+
+from slack_bolt.request import BoltRequest
+from slack_bolt.request.async_request import AsyncBoltRequest
+from slack_sdk import WebClient
+from slack_sdk.signature import SignatureVerifier
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.web.async_slack_response import AsyncSlackResponse
+from slack_sdk.web.slack_response import SlackResponse
+
+from benchmarks import import_app
+from includes import db, metrics
+
+RESPONSE = {"ok": True, "ts": "1700000000.000100", "user_id": "UBOT", "bot_id": "BBOT", "team_id": "T1"}
+posted = []  # perf_counter() of every chat.postMessage answered
+posted_lock = threading.Lock()
+
+
+def install_fake_web_api(latency):
+    def api_call(client, api_method, **kwargs):
+        time.sleep(latency)
+        with posted_lock:
+            if api_method == "chat.postMessage":
+                posted.append(time.perf_counter())
+        return SlackResponse(client=client, http_verb="POST", api_url=api_method, req_args={}, data=RESPONSE,
+                             headers={}, status_code=200)
+
+    async def async_api_call(client, api_method, **kwargs):
+        await asyncio.sleep(latency)
+        if api_method == "chat.postMessage":
+            posted.append(time.perf_counter())
+        return AsyncSlackResponse(client=client, http_verb="POST", api_url=api_method, req_args={}, data=RESPONSE,
+                                  headers={}, status_code=200)
+
+    WebClient.api_call = api_call
+    AsyncWebClient.api_call = async_api_call
+
+
+def command_body(i):
+    return urlencode({
+        "command": "/checklist", "text": "bench", "team_id": "T1", "user_id": "U1", "channel_id": "C1",
+        "trigger_id": f"bench-{time.time_ns()}-{i}", "response_url": "https://hooks.slack.invalid/1",
+    })
+
+
+def signed_headers(body):
+    timestamp = str(int(time.time()))
+    signature = SignatureVerifier(os.environ["SLACK_SIGNING_SECRET"]).generate_signature(timestamp=timestamp, body=body)
+    return {"content-type": ["application/x-www-form-urlencoded"], "x-slack-request-timestamp": [timestamp],
+            "x-slack-signature": [signature]}
+
+
+def wait_for_posts(count, timeout=600):
+    deadline = time.perf_counter() + timeout
+    while len(posted) < count and time.perf_counter() < deadline:
+        time.sleep(0.01)
+
+
+def run_sync(requests):
+    main = import_app("main")
+    bodies = [command_body(i) for i in range(requests)]
+    posted.clear()
+    started = time.perf_counter()
+    # One thread per open HTTP connection, as a threaded server would do
+    with ThreadPoolExecutor(max_workers=requests) as server:
+        list(server.map(lambda body: main.app.dispatch(BoltRequest(body=body, headers=signed_headers(body))), bodies))
+    wait_for_posts(requests)
+    return started
+
+
+async def run_async(requests):
+    async_main = import_app("async_main")
+    bodies = [command_body(i) for i in range(requests)]
+    posted.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        async_main.app.async_dispatch(AsyncBoltRequest(body=body, headers=signed_headers(body))) for body in bodies
+    ))
+    while len(posted) < requests:
+        await asyncio.sleep(0.01)
+    await async_main.async_db.async_engine.dispose()
+    return started
+
+
+def report(name, requests, started):
+    finished = sorted(posted)
+    latencies = [at - started for at in finished]
+    summary = metrics.summarize(latencies)
+    print(f"{name:>5}: {requests} requests in {finished[-1] - started:5.2f}s ({requests / (finished[-1] - started):6.1f} req/s), "
+          f"latency p50 {summary['p50']:.2f}s p95 {summary['p95']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per Web API call")
+    args = parser.parse_args()
+
+    install_fake_web_api(args.latency)
+    # Both entry points log every request; only the figures below matter here
+    logging.disable(logging.WARNING)
+    db.create_checklist("bench", "T1", "U1", [f"step {i}" for i in range(10)])
+    print(f"{args.requests} concurrent /checklist commands, {args.latency * 1000:.0f} ms per Web API call")
+    report("sync", args.requests, run_sync(args.requests))
+    report("async", args.requests, asyncio.run(run_async(args.requests)))
+
+
+if __name__ == "__main__":
+    main()
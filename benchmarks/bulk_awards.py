@@ -0,0 +1,59 @@
+"""Awarding and removing points for a whole team: one call per user against one batch.
+
+    python -m benchmarks.bulk_awards [--users 500]
+
+The per-user path is what ``/add @ann 5`` repeated for every user costs: one transaction
+and one summary message each. The batch path parses one ``/add @ann 5 @bob 5 ...``,
+applies it with record_debits (or remove_debits) in one transaction and renders one message.
+"""
+import argparse
+import time
+
+from sqlalchemy import event
+
+from includes import custom_blocks, db, utils
+
+statements = []
+
+
+def per_user(apply, workspace_id, entries):
+    messages = 0
+    for user_id, amount in entries:
+        result = apply(user_id, workspace_id, amount)
+        custom_blocks.points_summary_blocks([(user_id, *result)])
+        messages += 1
+    return messages
+
+
+def batch(apply, workspace_id, entries):
+    text = " ".join(f"@{user_id} {amount}" for user_id, amount in entries)
+    results = apply(workspace_id, utils.parse_input(text))
+    custom_blocks.points_summary_blocks(results)
+    return 1
+
+
+def measure(path, apply, workspace_id, entries):
+    statements.clear()
+    started = time.perf_counter()
+    messages = path(apply, workspace_id, entries)
+    return (time.perf_counter() - started) * 1000, len(statements), messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500)
+    args = parser.parse_args()
+
+    event.listen(db.engine, "before_cursor_execute", lambda *event_args: statements.append(event_args[2]))
+    entries = [(f"U{i:05d}", 5) for i in range(args.users)]
+    print(f"{args.users} users, 5 points each, on {db.engine.dialect.name}")
+    for operation, single, bulk in (("add", db.record_debit, db.record_debits),
+                                    ("remove", db.remove_debit, db.remove_debits)):
+        for name, path, apply in (("per user", per_user, single), ("batch", batch, bulk)):
+            workspace_id = f"bench-{name.replace(' ', '-')}"
+            elapsed, count, messages = measure(path, apply, workspace_id, entries)
+            print(f"{operation:>6} {name:>8}: {elapsed:8.1f} ms, {count:5} statements, {messages:3} messages")
+
+
+if __name__ == "__main__":
+    main()
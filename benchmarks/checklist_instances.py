@@ -0,0 +1,79 @@
+"""Checklist and instance creation: one ORM object per row against the bulk statements.
+
+    python -m benchmarks.checklist_instances [--sizes 10 100 1000] [--repeat 20]
+
+The old paths added every item and item status as its own ORM object, so each row
+became its own INSERT (and the item statuses needed the items loaded first). The bulk
+paths insert the items in one executemany and copy the statuses with INSERT ... SELECT.
+Reported per checklist size: statements sent and milliseconds per call.
+"""
+import argparse
+import time
+
+from sqlalchemy import event
+
+from includes import db
+
+statements = []
+
+
+def old_create_checklist(name, workspace_id, creator, items):
+    """create_checklist as it was before the bulk insert"""
+    with db.Session() as session:
+        checklist = db.Checklist(name=name, workspace=workspace_id, creator=creator, created_at=db.utcnow())
+        session.add(checklist)
+        session.flush()
+        for i, item_text in enumerate(items):
+            session.add(db.ChecklistItem(checklist_id=checklist.id, text=item_text, order=i))
+        session.commit()
+        return checklist.id
+
+
+def old_create_checklist_instance(checklist_id, channel, message_ts):
+    """create_checklist_instance as it was before INSERT ... SELECT"""
+    with db.Session() as session:
+        items = session.query(db.ChecklistItem).filter_by(checklist_id=checklist_id).all()
+        if not items:
+            return None
+        instance = db.ChecklistInstance(checklist_id=checklist_id, channel=channel, message_ts=message_ts,
+                                        created_at=db.utcnow(), is_complete=0)
+        session.add(instance)
+        session.flush()
+        for item in items:
+            session.add(db.ChecklistItemStatus(instance_id=instance.id, item_id=item.id, is_checked=0))
+        session.commit()
+        return instance.id
+
+
+def measure(function, *args, repeat=1):
+    statements.clear()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = function(*args)
+    elapsed = (time.perf_counter() - started) / repeat
+    return result, len(statements) // repeat, elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20, help="instances created per size")
+    args = parser.parse_args()
+
+    event.listen(db.engine, "before_cursor_execute", lambda *event_args: statements.append(event_args[2]))
+    print(f"{'items':>5} {'path':>4} {'create stmts':>12} {'create ms':>9} {'instance stmts':>14} {'instance ms':>11}")
+    for size in args.sizes:
+        items = [f"step {i}" for i in range(size)]
+        for path, create, instantiate in (("old", old_create_checklist, old_create_checklist_instance),
+                                          ("new", db.create_checklist, db.create_checklist_instance)):
+            name = f"bench-{path}-{size}"
+            _, create_statements, create_ms = measure(create, name, "bench", "U1", items)
+            checklist_id = db.get_checklist_by_name(name, "bench")["id"]
+            _, instance_statements, instance_ms = measure(instantiate, checklist_id, "C1", "1700000000.000100",
+                                                          repeat=args.repeat)
+            print(f"{size:>5} {path:>4} {create_statements:>12} {create_ms:>9.1f} "
+                  f"{instance_statements:>14} {instance_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Checklist re-render cost per toggle, with the block caches cleared before each render against kept.
+
+    python -m benchmarks.checklist_render [--sizes 10 100 500] [--toggles 2000]
+
+Each toggle flips one item and renders the whole instance, as handle_item_toggle does.
+With the caches cleared every block is rebuilt, which is what every render did before
+the header and item blocks were memoized; with them kept only the toggled item is.
+Reported: microseconds per render and the peak memory traced over a tenth as many renders.
+"""
+import argparse
+import datetime
+import time
+import tracemalloc
+
+from includes import custom_blocks
+
+CACHES = (custom_blocks._checklist_header_blocks, custom_blocks._checklist_item_block, custom_blocks.format_timestamp)
+
+
+def instance(size):
+    created_at = datetime.datetime(2026, 5, 1, 9, tzinfo=datetime.timezone.utc)
+    return {
+        "instance_id": 7,
+        "name": "Release",
+        "created_at": created_at,
+        "is_complete": 0,
+        "items": [
+            {"id": i, "text": f"Step {i}", "is_checked": i % 2, "checked_by": "U1" if i % 2 else None,
+             "checked_at": created_at + datetime.timedelta(minutes=i) if i % 2 else None}
+            for i in range(size)
+        ],
+    }
+
+
+def toggler(data, clear):
+    position = [0]
+
+    def toggle():
+        item = data["items"][position[0] % len(data["items"])]
+        position[0] += 1
+        item["is_checked"] ^= 1
+        if clear:
+            for cached in CACHES:
+                cached.cache_clear()
+        custom_blocks.render_checklist_instance(data)
+
+    return toggle
+
+
+def measure(toggle, toggles):
+    toggle()
+    started = time.perf_counter()
+    for _ in range(toggles):
+        toggle()
+    elapsed = (time.perf_counter() - started) / toggles
+
+    samples = max(1, toggles // 10)
+    tracemalloc.start()
+    for _ in range(samples):
+        toggle()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1e6, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--toggles", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'items':>5} {'caches':>7} {'us/render':>10} {'peak KiB':>9}")
+    for size in args.sizes:
+        for label, clear in (("cleared", True), ("kept", False)):
+            micros, peak = measure(toggler(instance(size), clear), args.toggles)
+            print(f"{size:>5} {label:>7} {micros:>10.1f} {peak / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
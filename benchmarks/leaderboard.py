@@ -0,0 +1,78 @@
+"""Leaderboard rendering for a large workspace: one message per user list against paginated pages.
+
+    python -m benchmarks.leaderboard [--users 10000]
+
+The old path loaded every balance and rendered one section per user into a single
+message, which Slack rejects beyond 50 blocks. The paginated path reads one page with
+LIMIT/OFFSET (served from the cached ranking after the first read) and packs ten users
+into each section. Reported: time and size of the first message, and of walking every page.
+"""
+import argparse
+import json
+import random
+import time
+
+from includes import custom_blocks, db, utils
+
+WORKSPACE = "bench-leaderboard"
+
+
+def old_leaderboard():
+    """/points without a user, as it was before pagination"""
+    with db.Session() as session:
+        user_points = session.query(db.UserDebit).filter_by(workspace=WORKSPACE).order_by(db.UserDebit.amount.desc()).all()
+    blocks = [{"type": "section", "text": {"type": "mrkdwn", "text": "*Here are all the users and points as of *"}},
+              {"type": "divider"}]
+    for user_data in user_points:
+        blocks.append({"type": "section", "text": {
+            "type": "mrkdwn", "text": f"*User: <@{user_data.user}>*\n *Point(s): {user_data.amount}*"}})
+    return blocks
+
+
+def page(cursor=None, page_size=custom_blocks.LEADERBOARD_PAGE_SIZE):
+    """main.get_leaderboard_page followed by the render"""
+    start_rank = utils.parse_leaderboard_cursor(cursor)
+    user_points = db.get_leaderboard(WORKSPACE, page_size + 1, start_rank - 1)
+    user_points, next_page = utils.split_leaderboard_page(user_points, page_size, start_rank)
+    return custom_blocks.user_points_blocks(user_points, start_rank, next_page, header=cursor is None), next_page
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    args = parser.parse_args()
+
+    db.record_debits(WORKSPACE, [(f"U{i:06d}", random.randint(1, 500)) for i in range(args.users)])
+    print(f"{args.users} users in one workspace")
+
+    blocks, elapsed = timed(old_leaderboard)
+    print(f"     old: {elapsed * 1000:7.1f} ms, 1 message of {len(blocks)} blocks "
+          f"({len(json.dumps(blocks)) / 1024:.0f} KiB, limit {custom_blocks.MAX_MESSAGE_BLOCKS} blocks)")
+
+    db.rankings.invalidate(WORKSPACE)
+    (blocks, cursor), elapsed = timed(page)
+    print(f"page 1 (cold): {elapsed * 1000:7.1f} ms, {len(blocks)} blocks ({len(json.dumps(blocks)) / 1024:.0f} KiB)")
+    (blocks, cursor), elapsed = timed(page)
+    print(f"page 1 (warm): {elapsed * 1000:7.1f} ms")
+
+    started = time.perf_counter()
+    pages, largest = 0, 0
+    cursor = None
+    while True:
+        blocks, cursor = page(cursor)
+        pages += 1
+        largest = max(largest, len(blocks))
+        if not cursor:
+            break
+    elapsed = time.perf_counter() - started
+    print(f"every page: {elapsed * 1000:7.1f} ms for {pages} pages, at most {largest} blocks each")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Read paths at scale: ORM entities against the column projections db.py now uses.
+
+    python -m benchmarks.read_paths [--rows 100000]
+
+Seeds ``--rows`` balances and checklists in one workspace, plus as many report schedules
+and reset modes. Each read is run both ways: loading whole model instances into the
+session (how these paths read before) and selecting only the needed columns as rows.
+Reported: milliseconds per read and peak traced memory.
+"""
+import argparse
+import time
+import tracemalloc
+
+from sqlalchemy import insert, select
+
+from includes import db
+
+WORKSPACE = "bench-reads"
+
+
+def seed(rows):
+    db.record_debits(WORKSPACE, [(f"U{i:06d}", i % 997) for i in range(rows)])
+    with db.Session() as session:
+        session.execute(insert(db.Checklist), [
+            {"name": f"checklist {i}", "workspace": WORKSPACE, "creator": "U1", "created_at": db.utcnow()}
+            for i in range(rows)
+        ])
+        session.execute(insert(db.ReportSchedule), [
+            {"day": "monday", "hour": 9, "workspace": f"bench-{i}"} for i in range(rows)
+        ])
+        session.execute(insert(db.ResetMode), [
+            {"reset_mode": "manual", "workspace": f"bench-{i}"} for i in range(rows)
+        ])
+        session.commit()
+
+
+READS = [
+    ("leaderboard load",
+     lambda session: [(row.user, row.amount) for row in session.query(db.UserDebit).filter_by(workspace=WORKSPACE)],
+     lambda session: session.execute(
+         select(db.UserDebit.user, db.UserDebit.amount).where(db.UserDebit.workspace == WORKSPACE)).all()),
+    ("get_all_checklists",
+     lambda session: [row.name for row in session.query(db.Checklist).filter_by(workspace=WORKSPACE)],
+     lambda session: db._get_all_checklists(session, WORKSPACE)),
+    ("get_report_daytime",
+     lambda session: session.query(db.ReportSchedule).all(),
+     db._get_report_daytime),
+    ("get_reset_mode",
+     lambda session: session.query(db.ResetMode).all(),
+     db._get_reset_mode),
+]
+
+
+def read(query):
+    with db.Session() as session:
+        return query(session)
+
+
+def measure(run, repeat=3):
+    run()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        run()
+    elapsed = (time.perf_counter() - started) / repeat
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    seed(args.rows)
+    print(f"{args.rows} rows per table on {db.engine.dialect.name}")
+    for name, entities, columns in READS:
+        for label, query in (("orm", entities), ("columns", columns)):
+            elapsed, peak = measure(lambda: read(query))
+            print(f"{name:>18} {label:>7}: {elapsed:7.0f} ms, peak {peak:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
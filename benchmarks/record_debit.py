@@ -0,0 +1,69 @@
+"""Hammer one user's balance from many threads: the old read-modify-write path against the upsert.
+
+    python -m benchmarks.record_debit [--threads 16] [--adds 200]
+
+The old path (SELECT, add in Python, commit) loses updates when two adds interleave
+and fails outright when SQLite cannot upgrade its read lock; the upsert applies every add.
+"""
+import argparse
+import threading
+import time
+
+from includes import db
+
+
+def read_modify_write(user_id, workspace_id, amount):
+    """record_debit as it was before the upsert"""
+    with db.Session() as session:
+        user_debit = session.query(db.UserDebit).filter_by(user=user_id, workspace=workspace_id).first()
+        if user_debit:
+            user_debit.amount += amount
+        else:
+            session.add(db.UserDebit(user=user_id, amount=amount, workspace=workspace_id))
+        session.commit()
+
+
+def upsert(user_id, workspace_id, amount):
+    db.record_debit(user_id, workspace_id, amount)
+
+
+def hammer(record, workspace_id, threads, adds):
+    errors = []
+    start = threading.Barrier(threads)
+
+    def worker():
+        start.wait()
+        for _ in range(adds):
+            try:
+                record("hot-user", workspace_id, 1)
+            except Exception as e:
+                errors.append(e)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    elapsed = time.perf_counter() - started
+
+    _, balance = db.get_single_user("hot-user", workspace_id)
+    return elapsed, balance or 0, len(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--adds", type=int, default=200, help="adds per thread")
+    args = parser.parse_args()
+
+    expected = args.threads * args.adds
+    print(f"{args.threads} threads x {args.adds} adds of 1 point to one user on {db.engine.dialect.name}")
+    for name, record in (("read-modify-write", read_modify_write), ("upsert", upsert)):
+        elapsed, balance, errors = hammer(record, f"bench-{name}", args.threads, args.adds)
+        print(f"{name:>17}: {elapsed:6.2f}s, {expected / elapsed:7.0f} adds/s, "
+              f"balance {balance:.0f}/{expected}, lost {expected - balance - errors:.0f}, failed {errors}")
+
+
+if __name__ == "__main__":
+    main()
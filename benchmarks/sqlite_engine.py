@@ -0,0 +1,86 @@
+"""Mixed read/write throughput across threads: SQLAlchemy's default SQLite engine against create_db_engine.
+
+    python -m benchmarks.sqlite_engine [--threads 12] [--seconds 5] [--write-ratio 0.2]
+
+Both engines get a fresh file; every thread runs balance reads and debit upserts for
+``--seconds`` and the throughput and "database is locked" failures are counted.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from includes import db
+
+USERS = 500
+
+
+def run(engine, threads, seconds, write_ratio):
+    db.Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as session:
+        db._record_debits(session, "bench", [(f"U{i}", 1) for i in range(USERS)])
+        session.commit()
+
+    counts = {"reads": 0, "writes": 0, "locked": 0}
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def worker():
+        done = {"reads": 0, "writes": 0, "locked": 0}
+        start.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            user_id = f"U{random.randrange(USERS)}"
+            write = random.random() < write_ratio
+            try:
+                with Session() as session:
+                    if write:
+                        db._record_debits(session, "bench", [(user_id, 1)])
+                        session.commit()
+                    else:
+                        db._get_single_user(session, user_id, "bench")
+                done["writes" if write else "reads"] += 1
+            except OperationalError:
+                done["locked"] += 1
+        with lock:
+            for key, value in done.items():
+                counts[key] += value
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    engine.dispose()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=12)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="debits-bench-")
+    engines = (
+        ("default", create_engine(f"sqlite:///{os.path.join(directory, 'default.db')}")),
+        ("tuned", db.create_db_engine(f"sqlite:///{os.path.join(directory, 'tuned.db')}")),
+    )
+    print(f"{args.threads} threads for {args.seconds:.0f}s, {args.write_ratio:.0%} writes")
+    for name, engine in engines:
+        counts = run(engine, args.threads, args.seconds, args.write_ratio)
+        total = counts["reads"] + counts["writes"]
+        print(f"{name:>7}: {total / args.seconds:7.0f} ops/s ({counts['reads'] / args.seconds:.0f} reads/s, "
+              f"{counts['writes'] / args.seconds:.0f} writes/s), {counts['locked']} 'database is locked' failures")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Weekly reports for many workspaces falling due at once, from the scheduler batch until Slack has them.
+
+    python -m benchmarks.weekly_reports [--workspaces 20] [--workers 8] [--latency 0.02]
+
+Every workspace's job is main.run_weekly_report: it claims the week, reads the leaderboard
+and queues its pages for #debits-general on main.outbox. The outbox is a real
+MessageDispatcher, rate buckets included, in front of a WebClient whose Web API answers
+after ``--latency`` seconds. The jobs run as one scheduler batch, as
+main.run_scheduler does when they share an hour. Reported: how long the batch took to
+queue every report, how long until the last one was posted, and the per-workspace time
+from claim to its last page posted (``report.workspace``).
+
+Every report goes to the same channel, so expect the total to follow
+dispatcher.CHANNEL_RATE (about one message per second) rather than the worker count.
+"""
+import argparse
+import datetime
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("SLACK_BOT_TOKEN", "xoxb-bench")
+os.environ.setdefault("SLACK_SIGNING_SECRET", "bench-secret")
+
+from slack_sdk import WebClient
+from slack_sdk.web.slack_response import SlackResponse
+
+from benchmarks import import_app
+from includes import db, dispatcher, metrics, scheduler
+
+RESPONSE = {"ok": True, "ts": "1700000000.000100", "user_id": "UBOT", "bot_id": "BBOT", "team_id": "T1"}
+posted = []  # one entry per chat.postMessage answered
+posted_lock = threading.Lock()
+
+
+def install_fake_web_api(latency):
+    def api_call(client, api_method, **kwargs):
+        time.sleep(latency)
+        if api_method == "chat.postMessage":
+            with posted_lock:
+                posted.append(api_method)
+        return SlackResponse(client=client, http_verb="POST", api_url=api_method, req_args={}, data=RESPONSE,
+                             headers={}, status_code=200)
+
+    WebClient.api_call = api_call
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workspaces", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per Web API call")
+    args = parser.parse_args()
+
+    install_fake_web_api(args.latency)
+    app = import_app("main")
+    # Every report is logged as it is queued; only the figures below matter here
+    logging.disable(logging.WARNING)
+    now = datetime.datetime.now()
+    day, hour = scheduler.WEEKDAYS[now.weekday()], now.hour
+    week = scheduler.week_key(now)
+    workspaces = [f"bench-{i}" for i in range(args.workspaces)]
+    for workspace_id in workspaces:
+        db.set_report_daytime(workspace_id, day, hour)
+        db.record_debits(workspace_id, [(f"U{user}", user + 1) for user in range(20)])
+
+    print(f"{args.workspaces} workspaces due at once, {args.latency * 1000:.0f} ms per Web API call, "
+          f"channel rate {dispatcher.CHANNEL_RATE[0]:g}/s (burst {dispatcher.CHANNEL_RATE[1]})")
+    for workers in sorted({1, args.workers}):
+        for workspace_id in workspaces:
+            db.release_weekly_report(workspace_id, week)
+        # A fresh outbox each round, so its buckets start full as they would after a quiet hour
+        app.outbox = dispatcher.MessageDispatcher(WebClient(token="xoxb-bench"))
+        posted.clear()
+        job_scheduler = scheduler.Scheduler(executor=ThreadPoolExecutor(max_workers=workers))
+        metrics.reset()
+
+        started = time.perf_counter()
+        job_scheduler.run_batch([
+            lambda workspace_id=workspace_id: app.run_weekly_report(workspace_id, day, hour)
+            for workspace_id in workspaces
+        ])
+        queued = time.perf_counter() - started
+        app.outbox.flush()
+        sent = time.perf_counter() - started
+        job_scheduler.executor.shutdown()
+
+        report = metrics.snapshot()["timings"]["report.workspace"]
+        print(f"{workers:>3} workers: queued in {queued:6.2f}s, {len(posted)} messages posted in {sent:6.2f}s, "
+              f"per workspace p50 {report['p50']:.2f}s p95 {report['p95']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import logging
+import os
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from includes import db
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def create_async_db_engine(url: str | None = None):
+    """Create the async engine used by async_main.py.
+
+    ``ASYNC_DATABASE_URL`` wins when set; otherwise the URL of the sync engine is
+    reused with its driver swapped for aiosqlite or asyncpg. Pool sizing and the
+    SQLite pragmas are the same as for the sync engine.
+    """
+    url = url or os.environ.get("ASYNC_DATABASE_URL")
+    url = make_url(url) if url else db.engine.url.set(drivername=ASYNC_DRIVERS[db.engine.dialect.name])
+
+    if url.get_backend_name() != "sqlite":
+        return create_async_engine(url, pool_pre_ping=True, **db.pool_options())
+
+    pragmas = db.sqlite_pragmas()
+    new_engine = create_async_engine(
+        url,
+        poolclass=AsyncAdaptedQueuePool,
+        connect_args={"timeout": pragmas["busy_timeout"] / 1000},
+        **db.pool_options(),
+    )
+    db.install_sqlite_pragmas(new_engine.sync_engine, pragmas)
+    return new_engine
+
+
+async_engine = create_async_db_engine()
+AsyncSession = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+
+async def run(query, *args, commit=False):
+    """Run one of the ``db._name(session, ...)`` statement functions on the async engine"""
+    async with AsyncSession() as session:
+        result = await session.run_sync(query, *args)
+        if commit:
+            await session.commit()
+        return result
+
+
+async def record_debit(user_id: str, workspace_id: str, amount: str | int, link=None, actor=None):
+    with db.rankings.writing(workspace_id) as committed:
+        result = await run(db._record_debit, user_id, workspace_id, int(amount), link, actor, commit=True)
+        committed.extend(db.ranked_balances([(user_id, *result)]))
+    return result
+
+
+async def record_debits(workspace_id: str, entries: list, link=None, actor=None) -> list:
+    with db.rankings.writing(workspace_id) as committed:
+        results = await run(db._record_debits, workspace_id, entries, link, actor, commit=True)
+        committed.extend(db.ranked_balances(results))
+    return results
+
+
+async def remove_debits(workspace_id: str, entries: list, link=None, actor=None) -> list:
+    try:
+        with db.rankings.writing(workspace_id) as committed:
+            results = await run(db._remove_debits, workspace_id, entries, link, actor, commit=True)
+            committed.extend(db.ranked_balances(results))
+        return results
+    except Exception as e:
+        print(f"An error occurred while removing debits: {e}")
+        return []
+
+
+async def remove_debit(user_id: str, workspace_id: str, amount: int, link=None, actor=None) -> tuple:
+    try:
+        with db.rankings.writing(workspace_id) as committed:
+            result = await run(db._remove_debit, user_id, workspace_id, amount, link, actor, commit=True)
+            committed.extend(db.ranked_balances([(user_id, *result)]))
+        return result
+    except Exception as e:
+        print(f"An error occurred while removing debit: {e}")
+        return None, None, None
+
+
+async def get_single_user(user_id: str, workspace_id: str) -> tuple:
+    try:
+        return await run(db._get_single_user, user_id, workspace_id)
+    except Exception as e:
+        print(f"An error occurred while retrieving single user data: {e}")
+        return None, None
+
+
+async def get_leaderboard(workspace_id: str, limit: int, offset: int = 0) -> list:
+    try:
+        return await run(db._get_leaderboard, workspace_id, limit, offset)
+    except Exception as e:
+        print(f"An error occurred while retrieving the leaderboard: {e}")
+        return []
+
+
+async def get_user_rank(user_id: str, workspace_id: str):
+    try:
+        return await run(db._get_user_rank, user_id, workspace_id)
+    except Exception as e:
+        print(f"An error occurred while retrieving the user's rank: {e}")
+        return None
+
+
+async def get_balance_at(user_id: str, workspace_id: str, when) -> float | None:
+    try:
+        return await run(db._get_balance_at, user_id, workspace_id, when)
+    except Exception as e:
+        print(f"An error occurred while retrieving the balance history: {e}")
+        return None
+
+
+async def set_reset_mode(workspace_id: str, mode: str) -> None:
+    try:
+        await run(db._set_reset_mode, workspace_id, mode, commit=True)
+    except Exception as e:
+        print(f"An error occurred while trying to update reset: {e}")
+
+
+async def get_reset_mode():
+    try:
+        return await run(db._get_reset_mode)
+    except Exception as e:
+        print(f"An error occurred while trying to retrieve reset mode: {e}")
+
+
+async def reset_debits_table(workspace_id: str, actor: str | None = None) -> None:
+    try:
+        deleted_rows = await run(db._reset_debits_table, workspace_id, None, actor, commit=True)
+        db.rankings.invalidate(workspace_id)
+        print(f"{deleted_rows} rows deleted from the user_debits table for workspace {workspace_id}")
+    except Exception as e:
+        print(f"An error occurred while trying to reset the database: {e}")
+
+
+async def reset_debits_for_period(workspace_id: str, period: str) -> bool:
+    try:
+        deleted_rows = await run(db._reset_debits_for_period, workspace_id, period, commit=True)
+    except Exception as e:
+        print(f"An error occurred while trying to reset the database: {e}")
+        return False
+    if deleted_rows is None:
+        return False
+    db.rankings.invalidate(workspace_id)
+    print(f"{deleted_rows} rows deleted from the user_debits table for workspace {workspace_id}")
+    return True
+
+
+async def set_report_daytime(workspace_id: str, day: str, hour: int) -> None:
+    try:
+        await run(db._set_report_daytime, workspace_id, day, hour, commit=True)
+    except Exception as e:
+        print(f"An error occurred while trying to set a new report time: {e}")
+
+
+async def get_report_daytime():
+    try:
+        return await run(db._get_report_daytime)
+    except Exception as e:
+        print(f"An error occurred while trying to retrieve report schedules: {e}")
+
+
+async def get_report_schedule(workspace_id: str):
+    try:
+        return await run(db._get_report_schedule, workspace_id)
+    except Exception as e:
+        print(f"An error occurred while trying to retrieve the report schedule: {e}")
+
+
+async def claim_weekly_report(workspace_id: str, day: str, hour: int, week: str) -> bool:
+    try:
+        return await run(db._claim_weekly_report, workspace_id, day, hour, week, commit=True)
+    except Exception as e:
+        print(f"An error occurred while claiming the weekly report: {e}")
+        return False
+
+
+async def release_weekly_report(workspace_id: str, week: str) -> None:
+    try:
+        await run(db._release_weekly_report, workspace_id, week, commit=True)
+    except Exception as e:
+        print(f"An error occurred while releasing the weekly report: {e}")
+
+
+async def create_checklist(name, workspace_id, creator, items):
+    """Create a new checklist with the given name and items"""
+    try:
+        created = await run(db._create_checklist, name, workspace_id, creator, items, commit=True)
+        db.invalidate_checklist(name, workspace_id)
+        return created
+    except Exception as e:
+        print(f"Error creating checklist: {e}")
+        return False
+
+
+async def get_checklist_by_name(name, workspace_id):
+    """Get a checklist by name, from the template cache when possible"""
+    template, entry = db.cached_checklist(name, workspace_id)
+    if template:
+        return template
+    try:
+        return await run(db._get_checklist_by_name, name, workspace_id, entry)
+    except Exception as e:
+        print(f"Error getting checklist: {e}")
+        return None
+
+
+async def get_all_checklists(workspace_id):
+    """Get all checklists for a workspace"""
+    try:
+        return await run(db._get_all_checklists, workspace_id)
+    except Exception as e:
+        print(f"Error getting checklists: {e}")
+        return []
+
+
+async def create_checklist_instance(checklist_id, channel, message_ts):
+    """Create a new instance of a checklist in a channel"""
+    try:
+        return await run(db._create_checklist_instance, checklist_id, channel, message_ts, commit=True)
+    except Exception as e:
+        print(f"Error creating checklist instance: {e}")
+        return None
+
+
+async def set_checklist_instance_message_ts(instance_id, message_ts):
+    """Record the Slack message timestamp of a posted checklist instance"""
+    try:
+        return await run(db._set_checklist_instance_message_ts, instance_id, message_ts, commit=True)
+    except Exception as e:
+        logging.error(f"Error updating checklist instance timestamp: {e}")
+        return False
+
+
+async def update_checklist_item(instance_id, item_id, checked, user_id):
+    """Update the status of a checklist item"""
+    try:
+        return await run(db._update_checklist_item, instance_id, item_id, checked, user_id, commit=True)
+    except Exception as e:
+        logging.error(f"Error updating checklist item: {e}")
+        return False
+
+
+async def get_checklist_instance(instance_id):
+    """Get a checklist instance with all items and their statuses"""
+    try:
+        return await run(db._get_checklist_instance, instance_id)
+    except Exception as e:
+        logging.error(f"Error getting checklist instance: {e}")
+        return None
+
+
+async def delete_checklist(name, workspace_id):
+    """Delete a checklist by name"""
+    try:
+        deleted = await run(db._delete_checklist, name, workspace_id, commit=True)
+        db.invalidate_checklist(name, workspace_id)
+        return deleted
+    except Exception as e:
+        print(f"Error deleting checklist: {e}")
+        return False
+
+
+async def claim_request(key: str, ttl_seconds: float) -> bool:
+    try:
+        return await run(db._claim_request, key, ttl_seconds, commit=True)
+    except Exception as e:
+        logging.error(f"Error claiming request {key}: {e}")
+        return True
+
+
+async def purge_processed_requests(ttl_seconds: float) -> int:
+    try:
+        return await run(db._purge_processed_requests, ttl_seconds, commit=True)
+    except Exception as e:
+        logging.error(f"Error purging processed requests: {e}")
+        return 0
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+from includes import metrics
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire ``ttl`` seconds after being stored.
+
+    When ``name`` is given, hits and misses are also counted in includes.metrics as
+    ``cache.<name>.hit`` / ``cache.<name>.miss``, and ``stats()`` is part of every metrics snapshot.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, name: str | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+        if name:
+            metrics.register_cache(name, self)
+
+    def _count(self, hit: bool) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        if self.name:
+            metrics.increment(f"cache.{self.name}.{'hit' if hit else 'miss'}")
+
+    def _lookup(self, key, now):
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key, value, now) -> None:
+        self._data[key] = (now + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lookup(key, time.monotonic())
+            self._count(value is not _MISSING)
+            return default if value is _MISSING else value
+
+    def set(self, key, value) -> None:
+        with self._lock:
+            self._store(key, value, time.monotonic())
+
+    def add(self, key, value=True) -> bool:
+        """Store ``value`` only if ``key`` is absent or expired; return whether it was stored"""
+        with self._lock:
+            now = time.monotonic()
+            if self._lookup(key, now) is not _MISSING:
+                return False
+            self._store(key, value, now)
+            return True
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return default if entry is None else entry[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -1,4 +1,7 @@
 import datetime
+import functools
+
+from includes import utils
 
 true = True
 
@@ -135,7 +138,7 @@ def points_modal(permalink, request_type, true=True):
                 },
                 "label": {
                     "type": "plain_text",
-                    "text": "Select User (One User)",
+                    "text": "Select Users",
                     "emoji": true
                 }
             },
@@ -174,38 +177,82 @@ def points_modal(permalink, request_type, true=True):
     }
 
 
-def user_points_blocks(user_points):
-    now = datetime.datetime.now()
-    date_time_str = now.strftime("%A, %B %d, %Y \n %I:%M %p")
-    blocks = [
-        {
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": f"*Here are all the users and points as of *\n {date_time_str}"
+# Slack rejects messages with more than 50 blocks and sections with more than 10 fields
+MAX_MESSAGE_BLOCKS = 50
+MAX_SECTION_FIELDS = 10
+
+# Users per /points page, and per weekly report message (header + sections fill the block limit)
+LEADERBOARD_PAGE_SIZE = 100
+REPORT_PAGE_SIZE = (MAX_MESSAGE_BLOCKS - 2) * MAX_SECTION_FIELDS
+
+
+def user_points_blocks(user_points, start_rank=1, next_page=None, header=True):
+    """Render one leaderboard page of (user, amount, rank), packing ten users into each section.
+
+    ``start_rank`` is the position of the first row; ``next_page`` is the cursor for the
+    following page and adds a "Next page" button.
+    """
+    blocks = []
+    if header:
+        now = datetime.datetime.now()
+        date_time_str = now.strftime("%A, %B %d, %Y \n %I:%M %p")
+        blocks += [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": f"*Here are all the users and points as of *\n {date_time_str}"
+                },
             },
-        },
+            {
+                "type": "divider"
+            }
+        ]
+
+    fields = [
         {
-            "type": "divider"
+            "type": "mrkdwn",
+            "text": f"*{user_data.rank}. <@{user_data.user}>*\n *Point(s): {user_data.amount}*"
         }
+        for user_data in user_points
     ]
-
-    for user_data in user_points:
-        user_id = user_data.user
-        total = user_data.amount
-        section_block = {
+    for start in range(0, len(fields), MAX_SECTION_FIELDS):
+        blocks.append({
             "type": "section",
+            "fields": fields[start:start + MAX_SECTION_FIELDS]
+        })
+
+    buttons = []
+    if start_rank > 1:
+        buttons.append({
+            "type": "button",
             "text": {
-                "type": "mrkdwn",
-                "text": f"*User: <@{user_id}>*\n *Point(s): {total}*"
-            }
-        }
-        blocks.append(section_block)
+                "type": "plain_text",
+                "text": "First page"
+            },
+            "action_id": "leaderboard_first_page",
+            "value": utils.leaderboard_cursor(1)
+        })
+    if next_page:
+        buttons.append({
+            "type": "button",
+            "text": {
+                "type": "plain_text",
+                "text": "Next page"
+            },
+            "style": "primary",
+            "action_id": "leaderboard_next_page",
+            "value": next_page
+        })
+    if buttons:
+        blocks.append({
+            "type": "actions",
+            "elements": buttons
+        })
 
     return blocks
 
 
-
 def add_points_block(pr_amount, amount, cur_amount, user_id, link=None, true=True):
     blocks = [
         {
@@ -286,6 +333,69 @@ def remove_points_block(pr_amount, amount, cur_amount, user_id, link=None, true=
     return blocks
 
 
+def points_summary_blocks(results, removed=False, link=None, true=True):
+    """One message for a batch of (user, previous, amount, current) results"""
+    if len(results) == 1:
+        user_id, pr_amount, amount, cur_amount = results[0]
+        points_block = remove_points_block if removed else add_points_block
+        return points_block(pr_amount, amount, cur_amount, user_id, link)
+
+    direction = "removed from" if removed else "added to"
+    total = sum(amount for _, _, amount, _ in results)
+    fields = [
+        {
+            "type": "mrkdwn",
+            "text": f"<@{user_id}>: {amount} \n*Previous:* {pr_amount} *Current:* {cur_amount}"
+        }
+        for user_id, pr_amount, amount, cur_amount in results
+    ]
+
+    blocks = [
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": f"{total} Points have been {direction} {len(results)} users"
+            }
+        },
+        {
+            "type": "divider"
+        }
+    ]
+    # Leave room for the "more" note and the thread button within the block limit
+    max_sections = MAX_MESSAGE_BLOCKS - len(blocks) - 2
+    for i in range(0, min(len(fields), max_sections * MAX_SECTION_FIELDS), MAX_SECTION_FIELDS):
+        blocks.append({"type": "section", "fields": fields[i:i + MAX_SECTION_FIELDS]})
+    hidden = len(fields) - max_sections * MAX_SECTION_FIELDS
+    if hidden > 0:
+        blocks.append({
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f"...and {hidden} more"
+                }
+            ]
+        })
+    if link:
+        blocks.append({
+            "type": "actions",
+            "elements": [
+                {
+                    "type": "button",
+                    "text": {
+                        "type": "plain_text",
+                        "emoji": true,
+                        "text": "Thread"
+                    },
+                    "style": "primary",
+                    "url": link
+                }
+            ]
+        })
+    return blocks
+
+
 def reset_db_modal_blocks():
     blocks = {
         "type": "modal",
@@ -501,25 +611,20 @@ def delete_checklist_modal(checklists):
     }
 
 
-def render_checklist_instance(instance_data):
-    """Render a checklist instance with completed items"""
-    # Safely get creation time with fallback
-    created_at = instance_data.get('created_at')
-    if created_at:
-        try:
-            created_time = datetime.datetime.fromisoformat(created_at).strftime('%b %d, %Y at %I:%M %p')
-            created_text = f"Created: {created_time}"
-        except (ValueError, TypeError):
-            created_text = "Creation time not available"
-    else:
-        created_text = "Creation time not available"
+# Rendered checklist blocks are memoized, so a toggle only builds the blocks that changed
+CHECKLIST_BLOCK_CACHE_SIZE = 8192
 
-    blocks = [
+
+@functools.lru_cache(maxsize=256)
+def _checklist_header_blocks(name, created_at):
+    created_time = format_timestamp(created_at, '%b %d, %Y at %I:%M %p')
+    created_text = f"Created: {created_time}" if created_time else "Creation time not available"
+    return (
         {
             "type": "header",
             "text": {
                 "type": "plain_text",
-                "text": f"📋 {instance_data.get('name', 'Unnamed Checklist')}",
+                "text": f"📋 {name}",
                 "emoji": True
             }
         },
@@ -535,105 +640,172 @@ def render_checklist_instance(instance_data):
         {
             "type": "divider"
         }
-    ]
+    )
+
+
+@functools.lru_cache(maxsize=CHECKLIST_BLOCK_CACHE_SIZE)
+def _checklist_item_block(instance_id, item_id, text, is_checked, checked_by, checked_at):
+    checked_info = ""
+    if is_checked and checked_by:
+        checked_time = format_timestamp(checked_at)
+        checked_info = f" ✅ _Completed by <@{checked_by}>"
+        if checked_time:
+            checked_info += f" on {checked_time}"
+        checked_info += "_"
+
+    # Create the checkbox element
+    checkbox = {
+        "type": "checkboxes",
+        "action_id": f"toggle_item_{item_id}_{instance_id}",
+        "options": [
+            {
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "Complete"
+                },
+                "value": f"item_{item_id}_{instance_id}"
+            }
+        ]
+    }
 
-    # Render each checklist item
-    for item in instance_data.get('items', []):
-        is_checked = item.get('is_checked', 0) == 1
-        checked_info = ""
-        
-        if is_checked and item.get('checked_by'):
-            checked_time = ""
-            if item.get('checked_at'):
-                try:
-                    checked_time = datetime.datetime.fromisoformat(item['checked_at']).strftime('%b %d at %I:%M %p')
-                except (ValueError, TypeError):
-                    checked_time = ""
-            checked_info = f" ✅ _Completed by <@{item['checked_by']}>"
-            if checked_time:
-                checked_info += f" on {checked_time}"
-            checked_info += "_"
-
-        # Create the checkbox element
-        checkbox = {
-            "type": "checkboxes",
-            "action_id": f"toggle_item_{item.get('id', '')}_{instance_data.get('instance_id', '')}",
-            "options": [
+    if is_checked:
+        checkbox["initial_options"] = checkbox["options"]
+
+    return {
+        "type": "section",
+        "text": {
+            "type": "mrkdwn",
+            "text": f"{text}{checked_info}"
+        },
+        "accessory": checkbox
+    }
+
+
+def _checklist_footer_blocks(created_at, completed_at):
+    time_str = "Time information not available"
+    completed_text = "Completion time not available"
+
+    try:
+        if created_at and completed_at:
+            time_str = utils.format_time_difference(created_at, completed_at)
+            completed_text = f"Completed: {format_timestamp(completed_at, '%b %d, %Y at %I:%M %p')}"
+    except (ValueError, TypeError, AttributeError):
+        pass
+
+    return [
+        {
+            "type": "divider"
+        },
+        {
+            "type": "context",
+            "elements": [
                 {
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": "Complete"
-                    },
-                    "value": f"item_{item.get('id', '')}_{instance_data.get('instance_id', '')}"
+                    "type": "mrkdwn",
+                    "text": f"✅ *All items completed!* Time taken: {time_str}"
+                }
+            ]
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": completed_text
                 }
             ]
         }
-        
-        if is_checked:
-            checkbox["initial_options"] = checkbox["options"]
+    ]
 
-        blocks.append({
+
+def render_checklist_instance(instance_data):
+    """Render a checklist instance with completed items.
+
+    The header and item blocks come from caches and are shared between renders, so
+    callers must not modify the returned blocks in place.
+    """
+    instance_id = instance_data.get('instance_id', '')
+    blocks = list(_checklist_header_blocks(
+        instance_data.get('name', 'Unnamed Checklist'), instance_data.get('created_at')
+    ))
+
+    # Render each checklist item; unchanged items are cache hits
+    for item in instance_data.get('items', []):
+        blocks.append(_checklist_item_block(
+            instance_id,
+            item.get('id', ''),
+            item.get('text', 'Unnamed item'),
+            item.get('is_checked', 0) == 1,
+            item.get('checked_by'),
+            item.get('checked_at'),
+        ))
+
+    # Add completion message if complete
+    if instance_data.get('is_complete', 0) == 1:
+        blocks.extend(_checklist_footer_blocks(
+            instance_data.get('created_at'),
+            instance_data.get('completed_at') or datetime.datetime.now(datetime.timezone.utc),
+        ))
+
+    return blocks
+
+
+@functools.lru_cache(maxsize=CHECKLIST_BLOCK_CACHE_SIZE)
+def format_timestamp(ts, fmt='%b %d at %I:%M %p'):
+    """Format a datetime (or ISO string) in local time, or return None if it is missing or malformed"""
+    if not ts:
+        return None
+    try:
+        if isinstance(ts, str):
+            ts = datetime.datetime.fromisoformat(ts)
+        if ts.tzinfo:
+            ts = ts.astimezone()
+        return ts.strftime(fmt)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def checklist_completed_blocks(checklist_name, time_taken, started=None, completed=None):
+    """Message posted to the channel once every item of a checklist instance is checked"""
+    blocks = [
+        {
             "type": "section",
             "text": {
                 "type": "mrkdwn",
-                "text": f"{item.get('text', 'Unnamed item')}{checked_info}"
-            },
-            "accessory": checkbox
+                "text": f"✅ *Checklist \"{checklist_name}\" has been completed!*"
+            }
+        },
+        {
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f"⏱️ Time taken: {time_taken}"
+                }
+            ]
+        }
+    ]
+
+    if started:
+        blocks.append({
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f"🕒 Started: {started}"
+                }
+            ]
         })
 
-    # Add completion message if complete
-    if instance_data.get('is_complete', 0) == 1:
-        time_str = "Time information not available"
-        completed_text = "Completion time not available"
-        
-        try:
-            created_at = instance_data.get('created_at')
-            completed_at = instance_data.get('completed_at', datetime.datetime.now().isoformat())
-            
-            if created_at and completed_at:
-                start = datetime.datetime.fromisoformat(created_at)
-                end = datetime.datetime.fromisoformat(completed_at)
-                delta = end - start
-                
-                hours, remainder = divmod(delta.seconds, 3600)
-                minutes, seconds = divmod(remainder, 60)
-                
-                if delta.days > 0:
-                    time_str = f"{delta.days} days, {hours} hours"
-                elif hours > 0:
-                    time_str = f"{hours} hours, {minutes} minutes"
-                elif minutes > 0:
-                    time_str = f"{minutes} minutes, {seconds} seconds"
-                else:
-                    time_str = f"{seconds} seconds"
-                
-                completed_text = f"Completed: {end.strftime('%b %d, %Y at %I:%M %p')}"
-        except (ValueError, TypeError, AttributeError):
-            pass
-
-        blocks.extend([
-            {
-                "type": "divider"
-            },
-            {
-                "type": "context",
-                "elements": [
-                    {
-                        "type": "mrkdwn",
-                        "text": f"✅ *All items completed!* Time taken: {time_str}"
-                    }
-                ]
-            },
-            {
-                "type": "context",
-                "elements": [
-                    {
-                        "type": "mrkdwn",
-                        "text": completed_text
-                    }
-                ]
-            }
-        ])
+    if completed:
+        blocks.append({
+            "type": "context",
+            "elements": [
+                {
+                    "type": "mrkdwn",
+                    "text": f"🏁 Completed: {completed}"
+                }
+            ]
+        })
 
     return blocks
 
@@ -0,0 +1,58 @@
+"""Drop repeated deliveries of the same Slack request before any handler runs.
+
+Keys are claimed in a bounded in-process TTL cache and, with ``DEDUP_BACKEND=database``,
+also in the ``processed_requests`` table so several processes agree on a single winner.
+"""
+import os
+
+from includes import cache, db
+
+TTL_SECONDS = float(os.environ.get("DEDUP_TTL_SECONDS", 900))
+MAX_KEYS = int(os.environ.get("DEDUP_MAX_KEYS", 10000))
+USE_DATABASE = os.environ.get("DEDUP_BACKEND", "memory").lower() == "database"
+
+# Purge expired rows from processed_requests once every this many database claims
+PURGE_EVERY = 1000
+
+_claimed = cache.TTLCache(MAX_KEYS, TTL_SECONDS, name="dedup")
+_database_claims = 0
+
+
+def get_delivery_key(body: dict) -> str | None:
+    """Identify one Slack delivery; retries of the same request share the key"""
+    if body.get("event_id"):
+        return f"event:{body['event_id']}"
+    if body.get("trigger_id"):
+        return f"trigger:{body['trigger_id']}"
+    return None
+
+
+def _should_purge() -> bool:
+    global _database_claims
+    _database_claims += 1
+    return _database_claims % PURGE_EVERY == 0
+
+
+def claim(key: str) -> bool:
+    """Return True for the first delivery of ``key`` and False for every repeat within the TTL"""
+    if not _claimed.add(key):
+        return False
+    if not USE_DATABASE:
+        return True
+    if _should_purge():
+        db.purge_processed_requests(TTL_SECONDS)
+    return db.claim_request(key, TTL_SECONDS)
+
+
+async def async_claim(key: str) -> bool:
+    """``claim`` for async_main.py, using the async engine for the database backend"""
+    if not _claimed.add(key):
+        return False
+    if not USE_DATABASE:
+        return True
+
+    from includes import async_db
+
+    if _should_purge():
+        await async_db.purge_processed_requests(TTL_SECONDS)
+    return await async_db.claim_request(key, TTL_SECONDS)
@@ -0,0 +1,328 @@
+"""Send outbound Slack messages in the background, within Slack's rate limits.
+
+Callers enqueue a Web API call and return immediately. Worker threads (or tasks, for
+``AsyncMessageDispatcher``) send queued calls once both the channel's and the method's
+token buckets allow it, keep each channel's messages in order, wait out ``Retry-After``
+on HTTP 429 and retry a bounded number of times. Calls enqueued with the same
+``coalesce_key`` while one is still queued replace it, so only the latest is sent; a
+``delay`` holds a call back for that long to collect such replacements (debounce).
+``on_sent`` and ``on_error`` tell the caller how the call finally went.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from slack_sdk.errors import SlackApiError
+
+from includes import metrics
+
+# (tokens per second, burst). Slack allows about one message per second per channel;
+# method limits follow the Web API tiers.
+CHANNEL_RATE = (1.0, 3)
+METHOD_RATES = {
+    "chat_postMessage": (5.0, 10),
+    "chat_update": (50 / 60, 5),
+}
+DEFAULT_METHOD_RATE = (20 / 60, 3)
+
+MAX_RETRIES = 3
+MAX_PENDING = int(os.environ.get("DISPATCH_MAX_PENDING", 1000))
+WORKERS = int(os.environ.get("DISPATCH_WORKERS", 4))
+# How long enqueue waits for room when the queue is full before dropping the call
+ENQUEUE_TIMEOUT_SECONDS = float(os.environ.get("DISPATCH_ENQUEUE_TIMEOUT_SECONDS", 5))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token is available"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+
+class Message:
+    __slots__ = ("method", "channel", "kwargs", "on_error", "on_sent", "coalesce_key", "render", "attempts",
+                 "enqueued_at", "not_before")
+
+    def __init__(self, method, channel, kwargs, on_error=None, coalesce_key=None, render=None, delay=0, on_sent=None):
+        self.method = method
+        self.channel = channel
+        self.kwargs = kwargs
+        self.on_error = on_error
+        self.on_sent = on_sent
+        self.coalesce_key = coalesce_key
+        self.render = render
+        self.attempts = 0
+        self.enqueued_at = time.monotonic()
+        self.not_before = self.enqueued_at + delay
+
+
+class _Outbox:
+    """Queue state shared by the thread and asyncio dispatchers; callers hold the lock"""
+
+    def __init__(self, client, max_pending: int = MAX_PENDING, workers: int = WORKERS):
+        self.client = client
+        self.max_pending = max_pending
+        self.workers = workers
+        self._queues = {}  # channel -> deque of messages, oldest first
+        self._pending = 0
+        self._queued_by_key = {}  # coalesce_key -> message still waiting to be sent
+        self._sending = set()  # channels with a call in flight, to keep their order
+        self._channel_buckets = {}
+        self._method_buckets = {}
+        self._blocked_until = {}  # method -> monotonic time given by Retry-After
+
+    def _coalesce(self, message) -> bool:
+        """Fold ``message`` into a queued one with the same key; return whether it was"""
+        queued = self._queued_by_key.get(message.coalesce_key) if message.coalesce_key is not None else None
+        if queued is None:
+            return False
+        queued.kwargs = message.kwargs
+        queued.on_error = message.on_error
+        queued.on_sent = message.on_sent
+        queued.render = message.render
+        metrics.increment("dispatcher.coalesced")
+        return True
+
+    def _push(self, message, front=False) -> None:
+        queue = self._queues.setdefault(message.channel, deque())
+        if front:
+            queue.appendleft(message)
+        else:
+            queue.append(message)
+        self._pending += 1
+        if message.coalesce_key is not None:
+            self._queued_by_key[message.coalesce_key] = message
+
+    def _wait_time(self, message, now: float) -> float:
+        channel_bucket = self._channel_buckets.get(message.channel)
+        if channel_bucket is None:
+            channel_bucket = self._channel_buckets[message.channel] = TokenBucket(*CHANNEL_RATE)
+        method_bucket = self._method_buckets.get(message.method)
+        if method_bucket is None:
+            rate = METHOD_RATES.get(message.method, DEFAULT_METHOD_RATE)
+            method_bucket = self._method_buckets[message.method] = TokenBucket(*rate)
+        return max(
+            channel_bucket.wait_time(now),
+            method_bucket.wait_time(now),
+            self._blocked_until.get(message.method, 0) - now,
+            message.not_before - now,
+        )
+
+    def _next(self, now: float) -> tuple:
+        """Pop the next message allowed to go now, or return how long until one may (None if idle)"""
+        soonest = None
+        for channel, queue in self._queues.items():
+            if channel in self._sending:
+                continue
+            message = queue[0]
+            wait = self._wait_time(message, now)
+            if wait > 0:
+                soonest = wait if soonest is None else min(soonest, wait)
+                continue
+
+            queue.popleft()
+            if not queue:
+                del self._queues[channel]
+            self._pending -= 1
+            if message.coalesce_key is not None:
+                self._queued_by_key.pop(message.coalesce_key, None)
+            self._sending.add(channel)
+            self._channel_buckets[channel].take(now)
+            self._method_buckets[message.method].take(now)
+            metrics.observe("dispatcher.queue_wait", now - message.enqueued_at)
+            return message, 0
+        return None, soonest
+
+    def _finish(self, message, error, now: float) -> bool:
+        """Release the message's channel; on a rate-limit error requeue it and return True"""
+        self._sending.discard(message.channel)
+        if error is None:
+            metrics.increment("dispatcher.sent")
+            return False
+        rate_limited = isinstance(error, SlackApiError) and error.response.status_code == 429
+        if not rate_limited or message.attempts >= MAX_RETRIES:
+            metrics.increment("dispatcher.failed")
+            return False
+
+        retry_after = float(error.response.headers.get("Retry-After", 1))
+        self._blocked_until[message.method] = max(self._blocked_until.get(message.method, 0), now + retry_after)
+        message.attempts += 1
+        # A newer call with the same coalesce_key queued meanwhile supersedes this one
+        if message.coalesce_key is None or message.coalesce_key not in self._queued_by_key:
+            self._push(message, front=True)
+        metrics.increment("dispatcher.retried")
+        return True
+
+    @staticmethod
+    def _report(message, error):
+        reason = error.response["error"] if isinstance(error, SlackApiError) else error
+        logging.error(f"Error calling {message.method} for channel {message.channel}: {reason}")
+        if message.on_error:
+            return message.on_error(error)
+
+    def _drop(self, message) -> None:
+        metrics.increment("dispatcher.dropped")
+        logging.error(f"Outbound queue full, dropping {message.method} for channel {message.channel}")
+
+    def __len__(self) -> int:
+        return self._pending
+
+
+class MessageDispatcher(_Outbox):
+    """Thread-based dispatcher; ``enqueue`` may be called from any thread"""
+
+    def __init__(self, client, max_pending: int = MAX_PENDING, workers: int = WORKERS):
+        super().__init__(client, max_pending, workers)
+        self._condition = threading.Condition()
+        self._threads = []
+
+    def enqueue(self, method: str, channel: str, on_error=None, coalesce_key=None, render=None, delay=0,
+                wait_for_room=False, on_sent=None, **kwargs) -> bool:
+        """Queue ``client.<method>(channel=channel, **kwargs)``; return False if it had to be dropped.
+
+        ``render``, if given, is called just before sending and returns more keyword arguments,
+        so a coalesced update shows the state at send time. ``on_sent`` is called with the
+        response once the call succeeds, ``on_error`` with the exception if it finally fails. While the queue is full the caller is held for up
+        to ENQUEUE_TIMEOUT_SECONDS and the call is then dropped; ``wait_for_room`` holds it for
+        as long as it takes instead, for scheduled and system messages that must not be lost.
+        """
+        message = Message(method, channel, kwargs, on_error, coalesce_key, render, delay, on_sent)
+        timeout = None if wait_for_room else ENQUEUE_TIMEOUT_SECONDS
+        with self._condition:
+            if not self._coalesce(message):
+                # Backpressure: hold the caller while the queue is full, up to a limit
+                if not self._condition.wait_for(lambda: self._pending < self.max_pending, timeout):
+                    self._drop(message)
+                    return False
+                self._push(message)
+            self._start()
+            self._condition.notify_all()
+        return True
+
+    def _start(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"dispatcher-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                message, wait = self._next(time.monotonic())
+                if message is None:
+                    self._condition.wait(wait)
+                    continue
+                self._condition.notify_all()
+
+            error = response = None
+            try:
+                kwargs = dict(message.kwargs, **message.render()) if message.render else message.kwargs
+                response = getattr(self.client, message.method)(channel=message.channel, **kwargs)
+            except Exception as e:
+                error = e
+
+            with self._condition:
+                retried = self._finish(message, error, time.monotonic())
+                self._condition.notify_all()
+            if error is not None and not retried:
+                self._report(message, error)
+            elif error is None and message.on_sent:
+                message.on_sent(response)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every queued call has been sent; return False on timeout"""
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._pending and not self._sending, timeout)
+
+
+class AsyncMessageDispatcher(_Outbox):
+    """asyncio dispatcher for ``AsyncWebClient``; ``enqueue`` is awaited on the loop"""
+
+    def __init__(self, client, max_pending: int = MAX_PENDING, workers: int = WORKERS):
+        super().__init__(client, max_pending, workers)
+        self._condition = asyncio.Condition()
+        self._tasks = []
+
+    async def enqueue(self, method: str, channel: str, on_error=None, coalesce_key=None, render=None, delay=0,
+                      wait_for_room=False, on_sent=None, **kwargs) -> bool:
+        """See MessageDispatcher.enqueue; ``render``, ``on_sent`` and ``on_error`` may be coroutine functions"""
+        message = Message(method, channel, kwargs, on_error, coalesce_key, render, delay, on_sent)
+        timeout = None if wait_for_room else ENQUEUE_TIMEOUT_SECONDS
+        async with self._condition:
+            if not self._coalesce(message):
+                try:
+                    await asyncio.wait_for(self._condition.wait_for(lambda: self._pending < self.max_pending), timeout)
+                except asyncio.TimeoutError:
+                    self._drop(message)
+                    return False
+                self._push(message)
+            self._start()
+            self._condition.notify_all()
+        return True
+
+    def _start(self) -> None:
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._run()))
+
+    async def _run(self) -> None:
+        while True:
+            async with self._condition:
+                message, wait = self._next(time.monotonic())
+                if message is None:
+                    try:
+                        await asyncio.wait_for(self._condition.wait(), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                self._condition.notify_all()
+
+            error = response = None
+            try:
+                kwargs = message.kwargs
+                if message.render:
+                    rendered = message.render()
+                    kwargs = dict(kwargs, **(await rendered if asyncio.iscoroutine(rendered) else rendered))
+                response = await getattr(self.client, message.method)(channel=message.channel, **kwargs)
+            except Exception as e:
+                error = e
+
+            async with self._condition:
+                retried = self._finish(message, error, time.monotonic())
+                self._condition.notify_all()
+            result = None
+            if error is not None and not retried:
+                result = self._report(message, error)
+            elif error is None and message.on_sent:
+                result = message.on_sent(response)
+            if asyncio.iscoroutine(result):
+                await result
+
+    async def flush(self, timeout: float | None = None) -> bool:
+        async with self._condition:
+            try:
+                await asyncio.wait_for(self._condition.wait_for(lambda: not self._pending and not self._sending), timeout)
+                return True
+            except asyncio.TimeoutError:
+                return False
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
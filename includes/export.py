@@ -0,0 +1,162 @@
+"""Stream debits, the debit ledger and checklist history out of the database as CSV or NDJSON.
+
+Rows are read ``EXPORT_YIELD_PER`` at a time (server-side cursors where the driver has
+them) and written into parts of about ``EXPORT_PART_BYTES``, so memory stays flat however
+many rows there are. ``/export`` uploads each part with ``files_upload_v2``; from a shell::
+
+    python -m includes.export T0123456 --dataset ledger --format ndjson --output ledger.ndjson
+"""
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import sys
+
+from sqlalchemy import select
+
+from includes import db
+
+YIELD_PER = int(os.environ.get("EXPORT_YIELD_PER", 5000))
+PART_BYTES = int(os.environ.get("EXPORT_PART_BYTES", 8 * 1024 * 1024))
+
+FORMATS = {"csv": "csv", "ndjson": "ndjson", "json": "ndjson"}
+
+
+def _debits(workspace_id):
+    return select(db.UserDebit.user, db.UserDebit.amount, db.UserDebit.link).where(
+        db.UserDebit.workspace == workspace_id
+    ).order_by(db.UserDebit.amount.desc(), db.UserDebit.id)
+
+
+def _ledger(workspace_id):
+    return select(
+        db.DebitEvent.id, db.DebitEvent.ts, db.DebitEvent.user, db.DebitEvent.delta, db.DebitEvent.balance_after,
+        db.DebitEvent.link, db.DebitEvent.actor, db.DebitEvent.period,
+    ).where(db.DebitEvent.workspace == workspace_id).order_by(db.DebitEvent.id)
+
+
+def _checklists(workspace_id):
+    # One row per item of every checklist instance
+    return select(
+        db.ChecklistInstance.id.label("instance_id"),
+        db.Checklist.name.label("checklist"),
+        db.ChecklistInstance.channel,
+        db.ChecklistInstance.created_at,
+        db.ChecklistInstance.is_complete,
+        db.ChecklistInstance.completed_at,
+        db.ChecklistItem.text.label("item"),
+        db.ChecklistItemStatus.is_checked,
+        db.ChecklistItemStatus.checked_by,
+        db.ChecklistItemStatus.checked_at,
+    ).select_from(db.ChecklistInstance).join(
+        db.Checklist, db.Checklist.id == db.ChecklistInstance.checklist_id
+    ).join(
+        db.ChecklistItemStatus, db.ChecklistItemStatus.instance_id == db.ChecklistInstance.id
+    ).join(
+        db.ChecklistItem, db.ChecklistItem.id == db.ChecklistItemStatus.item_id
+    ).where(db.Checklist.workspace == workspace_id).order_by(db.ChecklistInstance.id, db.ChecklistItem.order)
+
+
+DATASETS = {
+    "debits": _debits,
+    "ledger": _ledger,
+    "checklists": _checklists,
+}
+
+
+def _cell(value):
+    return value.isoformat() if isinstance(value, datetime.datetime) else value
+
+
+def iter_export(dataset: str, workspace_id: str, fmt: str = "csv", part_bytes: int = PART_BYTES):
+    """Yield the export as UTF-8 byte parts of about ``part_bytes``; every CSV part starts with the header"""
+    statement = DATASETS[dataset](workspace_id)
+    columns = list(statement.selected_columns.keys())
+    csv_format = FORMATS[fmt] == "csv"
+
+    buffer = io.BytesIO()
+    text = io.TextIOWrapper(buffer, encoding="utf-8", newline="", write_through=True)
+    writer = csv.writer(text)
+    has_rows = False
+    if csv_format:
+        writer.writerow(columns)
+
+    with db.engine.connect() as connection:
+        for row in connection.execution_options(yield_per=YIELD_PER).execute(statement):
+            cells = [_cell(value) for value in row]
+            if csv_format:
+                writer.writerow(cells)
+            else:
+                text.write(json.dumps(dict(zip(columns, cells))))
+                text.write("\n")
+            has_rows = True
+
+            if buffer.tell() >= part_bytes:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                has_rows = False
+                if csv_format:
+                    writer.writerow(columns)
+
+    if has_rows:
+        yield buffer.getvalue()
+
+
+def parse_command(text: str) -> tuple:
+    """Return ``(dataset, format)`` from ``/export`` text such as ``ledger ndjson``"""
+    dataset, fmt = "debits", "csv"
+    for word in str(text or "").lower().split():
+        if word in DATASETS:
+            dataset = word
+        elif word in FORMATS:
+            fmt = word
+        else:
+            raise ValueError(
+                f"Unknown export option '{word}'. Use one of {', '.join(DATASETS)} and csv or ndjson "
+                "(e.g., '/export ledger csv')"
+            )
+    return dataset, fmt
+
+
+def filename(dataset: str, workspace_id: str, fmt: str, part: int) -> str:
+    return f"{dataset}-{workspace_id}-{part}.{FORMATS[fmt]}"
+
+
+def upload(client, channel_id: str, dataset: str, workspace_id: str, fmt: str = "csv") -> int:
+    """Upload the export to ``channel_id`` one part at a time; return the number of parts"""
+    parts = 0
+    for parts, content in enumerate(iter_export(dataset, workspace_id, fmt), start=1):
+        client.files_upload_v2(
+            channel=channel_id,
+            content=content,
+            filename=filename(dataset, workspace_id, fmt, parts),
+            title=f"{dataset} export, part {parts}",
+        )
+    return parts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a workspace's data as CSV or NDJSON")
+    parser.add_argument("workspace", help="Slack team ID of the workspace")
+    parser.add_argument("--dataset", choices=sorted(DATASETS), default="debits")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--output", help="file to write, standard output by default")
+    args = parser.parse_args(argv)
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for part, content in enumerate(iter_export(args.dataset, args.workspace, args.format)):
+            if part and FORMATS[args.format] == "csv":
+                # Parts after the first repeat the header; a single file needs it once
+                content = content.split(b"\n", 1)[1]
+            output.write(content)
+    finally:
+        if args.output:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""Per-workspace leaderboards kept sorted in memory.
+
+A ``Ranking`` is loaded from user_debits once and then updated in place with the
+balances returned by each write (see ``Rankings.writing``), so reading the top users or
+one user's rank never re-sorts the table. Users with the same amount share a rank (1, 2, 2, 4). Entries
+expire after ``LEADERBOARD_CACHE_TTL_SECONDS`` to pick up writes made by other processes.
+"""
+import contextlib
+import os
+import threading
+from bisect import bisect_left, insort
+from typing import NamedTuple
+
+from includes import cache
+
+TTL_SECONDS = float(os.environ.get("LEADERBOARD_CACHE_TTL_SECONDS", 60))
+MAX_WORKSPACES = int(os.environ.get("LEADERBOARD_CACHE_MAX_ENTRIES", 100))
+
+
+class RankedUser(NamedTuple):
+    user: str
+    amount: float
+    rank: int
+
+
+class Ranking:
+    """Users of one workspace ordered by amount, highest first, then by name"""
+
+    def __init__(self, rows):
+        self._amounts = {user: float(amount) for user, amount in rows}
+        self._keys = sorted((-amount, user) for user, amount in self._amounts.items())
+        self._lock = threading.Lock()
+
+    def update(self, balances) -> None:
+        """Apply (user, amount) pairs; an amount of None removes the user"""
+        with self._lock:
+            for user, amount in balances:
+                previous = self._amounts.pop(user, None)
+                if previous is not None:
+                    del self._keys[bisect_left(self._keys, (-previous, user))]
+                if amount is not None:
+                    amount = self._amounts[user] = float(amount)
+                    insort(self._keys, (-amount, user))
+
+    def _ranked(self, key) -> RankedUser:
+        # One more than the number of users with a strictly higher amount
+        return RankedUser(key[1], -key[0], bisect_left(self._keys, (key[0],)) + 1)
+
+    def top(self, limit: int, offset: int = 0) -> list:
+        with self._lock:
+            return [self._ranked(key) for key in self._keys[offset:offset + limit]]
+
+    def rank(self, user: str) -> RankedUser | None:
+        with self._lock:
+            amount = self._amounts.get(user)
+            return None if amount is None else self._ranked((-amount, user))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class Rankings:
+    """Cache of ``Ranking`` by workspace.
+
+    Balance writes run inside ``writing``. A write that overlapped no other write of the
+    workspace patches the cached ranking with its committed balances; when writes overlap
+    the order they committed in is unknown, so the entry is dropped and the next read loads
+    it again. Every write and invalidation bumps the workspace's version, even when nothing
+    is cached, so a load that raced one is not stored.
+    """
+
+    def __init__(self, maxsize: int = MAX_WORKSPACES, ttl: float = TTL_SECONDS):
+        self._cache = cache.TTLCache(maxsize, ttl, name="leaderboard")
+        self._versions = {}
+        self._writes = {}  # workspace -> [writes in flight, writes started while any was in flight]
+        self._lock = threading.Lock()
+
+    def lookup(self, workspace_id: str) -> tuple:
+        """Return ``(ranking, version)``; ranking is None on a miss, then pass version to ``store``"""
+        with self._lock:
+            return self._cache.get(workspace_id), self._versions.get(workspace_id, 0)
+
+    def store(self, workspace_id: str, rows, version: int) -> Ranking:
+        ranking = Ranking(rows)
+        with self._lock:
+            if self._versions.get(workspace_id, 0) == version:
+                self._cache.set(workspace_id, ranking)
+        return ranking
+
+    @contextlib.contextmanager
+    def writing(self, workspace_id: str):
+        """Wrap one balance write; extend the yielded list with its (user, amount) pairs once committed.
+
+        An amount of None removes the user. If the block raises, the entry is dropped.
+        """
+        with self._lock:
+            writes = self._writes.setdefault(workspace_id, [0, 0])
+            overlapped = writes[0] > 0
+            writes[0] += 1
+            writes[1] += 1
+            started = writes[1]
+
+        committed = []
+        try:
+            yield committed
+        except BaseException:
+            self._finish_write(workspace_id, started, True, None)
+            raise
+        self._finish_write(workspace_id, started, overlapped, committed)
+
+    def _finish_write(self, workspace_id, started, overlapped, balances) -> None:
+        with self._lock:
+            writes = self._writes[workspace_id]
+            writes[0] -= 1
+            # Another write began while this one was in flight
+            overlapped = overlapped or writes[1] != started
+            if not writes[0]:
+                del self._writes[workspace_id]
+
+            self._versions[workspace_id] = self._versions.get(workspace_id, 0) + 1
+            ranking = self._cache.get(workspace_id)
+            if ranking is None:
+                return
+            if overlapped or balances is None:
+                self._cache.pop(workspace_id)
+            else:
+                ranking.update(balances)
+
+    def invalidate(self, workspace_id: str) -> None:
+        with self._lock:
+            self._versions[workspace_id] = self._versions.get(workspace_id, 0) + 1
+            self._cache.pop(workspace_id)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
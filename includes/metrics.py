@@ -0,0 +1,73 @@
+import threading
+from collections import defaultdict, deque
+
+# Keep the most recent samples per timing so percentiles follow current behaviour
+MAX_SAMPLES = 1000
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_timings = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+_caches = {}  # name -> object with a stats() method, reported by snapshot()
+
+
+def increment(name: str, value: int = 1) -> None:
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name: str, seconds: float) -> None:
+    with _lock:
+        _timings[name].append(seconds)
+
+
+def register_cache(name: str, cache) -> None:
+    """Report ``cache.stats()`` under ``name`` in every snapshot; a later cache with the same name replaces it"""
+    with _lock:
+        _caches[name] = cache
+
+
+def summarize(samples) -> dict:
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        "count": count,
+        "avg": sum(ordered) / count,
+        "p50": ordered[count // 2],
+        "p95": ordered[min(count - 1, int(count * 0.95))],
+        "max": ordered[-1],
+    }
+
+
+def snapshot() -> dict:
+    """Return the current counters, a summary of every timing and the stats of every registered cache"""
+    with _lock:
+        counters = dict(_counters)
+        timings = {name: list(samples) for name, samples in _timings.items() if samples}
+        caches = dict(_caches)
+    return {
+        "counters": counters,
+        "timings": {name: summarize(samples) for name, samples in timings.items()},
+        "caches": {name: cache.stats() for name, cache in caches.items()},
+    }
+
+
+def format_snapshot(current: dict) -> str:
+    """Render a snapshot as one line per counter, timing and cache, for the periodic log"""
+    lines = [f"{name}: {value}" for name, value in sorted(current["counters"].items())]
+    lines += [
+        f"{name}: n={timing['count']} avg={timing['avg'] * 1000:.1f}ms p50={timing['p50'] * 1000:.1f}ms "
+        f"p95={timing['p95'] * 1000:.1f}ms max={timing['max'] * 1000:.1f}ms"
+        for name, timing in sorted(current["timings"].items())
+    ]
+    lines += [
+        f"cache {name}: size={stats['size']} hits={stats['hits']} misses={stats['misses']} "
+        f"hit_rate={stats['hit_rate']:.1%}"
+        for name, stats in sorted(current["caches"].items())
+    ]
+    return "\n".join(lines)
+
+
+def reset() -> None:
+    with _lock:
+        _counters.clear()
+        _timings.clear()
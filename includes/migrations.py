@@ -0,0 +1,215 @@
+import datetime
+import logging
+
+from sqlalchemy import Column, Integer, MetaData, Table, bindparam, func, inspect, literal, select, text, update
+
+schema_version_metadata = MetaData()
+
+schema_version = Table(
+    'schema_version',
+    schema_version_metadata,
+    Column('version', Integer, primary_key=True),
+)
+
+
+def _create_indexes(connection, metadata, names):
+    """Create the named indexes declared on the models, skipping ones that already exist"""
+    indexes = {index.name: index for table in metadata.tables.values() for index in table.indexes}
+    for name in names:
+        indexes[name].create(connection, checkfirst=True)
+
+
+def _create_tables(connection, metadata, names):
+    """Create the named tables declared on the models, with their indexes, if they do not exist yet"""
+    metadata.create_all(connection, tables=[metadata.tables[name] for name in names])
+
+
+def _add_columns(connection, metadata, table_name, names):
+    """Add the named model columns to an existing table, skipping ones that already exist"""
+    existing = {column['name'] for column in inspect(connection).get_columns(table_name)}
+    table = metadata.tables[table_name]
+    for name in names:
+        if name not in existing:
+            column_type = table.c[name].type.compile(connection.dialect)
+            connection.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {name} {column_type}'))
+
+
+def baseline(connection, metadata):
+    """Create any missing tables and enforce one user_debits row per user and workspace"""
+    metadata.create_all(connection)
+
+    # Fold duplicates left behind by the old read-modify-write path into the oldest row,
+    # otherwise the unique index cannot be created.
+    connection.execute(text("""
+        UPDATE user_debits
+        SET amount = (
+            SELECT SUM(d.amount) FROM user_debits d
+            WHERE d."user" = user_debits."user" AND d.workspace = user_debits.workspace
+        )
+        WHERE id IN (SELECT MIN(id) FROM user_debits GROUP BY "user", workspace HAVING COUNT(*) > 1)
+    """))
+    connection.execute(text("""
+        DELETE FROM user_debits
+        WHERE id NOT IN (SELECT MIN(id) FROM user_debits GROUP BY "user", workspace)
+    """))
+    _create_indexes(connection, metadata, ['uq_user_debits_user_workspace'])
+
+
+def hot_lookup_indexes(connection, metadata):
+    """Index every lookup issued by includes/db.py"""
+    _create_indexes(connection, metadata, [
+        'ix_user_debits_workspace_amount',
+        'ix_reset_mode_workspace',
+        'ix_reports_schedule_workspace',
+        'ix_checklists_workspace_name',
+        'ix_checklist_items_checklist_id_order',
+        'ix_checklist_instances_checklist_id',
+        'ix_checklist_item_status_instance_id_item_id',
+    ])
+
+
+def processed_requests(connection, metadata):
+    """Table used to deduplicate Slack retries across processes"""
+    _create_tables(connection, metadata, ['processed_requests'])
+
+
+def leaderboard_keyset_index(connection, metadata):
+    """Add id to the leaderboard index so keyset pages are read straight from it"""
+    connection.execute(text("DROP INDEX IF EXISTS ix_user_debits_workspace_amount"))
+    _create_indexes(connection, metadata, ['ix_user_debits_workspace_amount'])
+
+
+def weekly_report_claims(connection, metadata):
+    """Remember the last week each workspace's report was sent"""
+    _add_columns(connection, metadata, 'reports_schedule', ['last_report_week'])
+
+
+def reset_periods(connection, metadata):
+    """Persist the month of each workspace's last automatic reset"""
+    _add_columns(connection, metadata, 'reset_mode', ['last_reset_period'])
+    # Which resets already happened was only kept in memory; count the current month as done
+    connection.execute(
+        text("UPDATE reset_mode SET last_reset_period = :period WHERE last_reset_period IS NULL"),
+        {"period": datetime.date.today().strftime("%Y-%m")},
+    )
+
+
+def checklist_datetimes(connection, metadata):
+    """Store checklist timestamps as timezone-aware UTC datetimes instead of ISO strings"""
+    columns = [
+        ('checklists', 'created_at'),
+        ('checklist_instances', 'created_at'),
+        ('checklist_instances', 'completed_at'),
+        ('checklist_item_status', 'checked_at'),
+    ]
+    for table_name, name in columns:
+        # The old values are naive isoformat() strings in the server's local time
+        rows = connection.execute(
+            text(f'SELECT id, {name} FROM {table_name} WHERE {name} IS NOT NULL')
+        ).fetchall()
+        values = []
+        for row_id, value in rows:
+            try:
+                converted = datetime.datetime.fromisoformat(value).astimezone(datetime.timezone.utc)
+                values.append({"row_id": row_id, "value": converted})
+            except (ValueError, TypeError):
+                logging.warning(f"Leaving unparseable {table_name}.{name} of row {row_id}: {value!r}")
+
+        table = metadata.tables[table_name]
+        if connection.dialect.name != 'sqlite':
+            # SQLite compares and stores the new values as text either way
+            column_type = table.c[name].type.compile(connection.dialect)
+            connection.execute(text(
+                f'ALTER TABLE {table_name} ALTER COLUMN {name} TYPE {column_type} USING {name}::{column_type}'
+            ))
+        if values:
+            connection.execute(
+                update(table).where(table.c.id == bindparam('row_id')).values({name: bindparam('value')}),
+                values,
+            )
+    _create_indexes(connection, metadata, ['ix_checklist_instances_created_at'])
+
+
+def debit_events(connection, metadata):
+    """Start the debit ledger with one opening event per existing balance"""
+    _create_tables(connection, metadata, ['debit_events'])
+    events, debits = metadata.tables['debit_events'], metadata.tables['user_debits']
+    opened_at = literal(datetime.datetime.now(datetime.timezone.utc), events.c.ts.type)
+    connection.execute(events.insert().from_select(
+        ['user', 'workspace', 'delta', 'balance_after', 'link', 'ts'],
+        select(debits.c.user, debits.c.workspace, debits.c.amount, debits.c.amount, debits.c.link, opened_at),
+    ))
+
+
+def export_indexes(connection, metadata):
+    """Let exports read a workspace's ledger in id order without sorting it"""
+    _create_indexes(connection, metadata, ['ix_debit_events_workspace_id'])
+
+
+# Append new migrations to the end; a database records the highest version it has applied.
+MIGRATIONS = [
+    (1, baseline),
+    (2, hot_lookup_indexes),
+    (3, processed_requests),
+    (4, leaderboard_keyset_index),
+    (5, weekly_report_claims),
+    (6, reset_periods),
+    (7, checklist_datetimes),
+    (8, debit_events),
+    (9, export_indexes),
+]
+
+
+def get_schema_version(connection) -> int:
+    return connection.execute(select(func.coalesce(func.max(schema_version.c.version), 0))).scalar()
+
+
+# PostgreSQL advisory lock held while migrating; any constant shared by every process works
+MIGRATION_LOCK_KEY = 7_325_110
+# How long a process waits for another one to finish migrating a SQLite database
+SQLITE_LOCK_TIMEOUT_SECONDS = 600
+
+
+def _lock(connection) -> None:
+    """Take the database-wide migration lock; it is released when the transaction ends"""
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': MIGRATION_LOCK_KEY})
+    elif connection.dialect.name == 'sqlite':
+        # Take the write lock now rather than at the first write, after the version was read
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def run_migrations(engine, metadata) -> int:
+    """Bring the database up to the latest schema version and return that version.
+
+    Replicas may start together: each migration runs in its own transaction under a
+    database-wide lock, and the version is read again once the lock is held, so only
+    one process applies it and the others skip it.
+    """
+    latest = MIGRATIONS[-1][0]
+    with engine.connect() as connection:
+        if inspect(connection).has_table('schema_version') and get_schema_version(connection) >= latest:
+            return get_schema_version(connection)
+        if connection.dialect.name == 'sqlite':
+            busy_timeout = connection.exec_driver_sql('PRAGMA busy_timeout').scalar()
+            connection.exec_driver_sql(f'PRAGMA busy_timeout={SQLITE_LOCK_TIMEOUT_SECONDS * 1000}')
+        connection.rollback()
+
+        try:
+            with connection.begin():
+                _lock(connection)
+                schema_version_metadata.create_all(connection)
+
+            for version, migration in MIGRATIONS:
+                with connection.begin():
+                    _lock(connection)
+                    if get_schema_version(connection) >= version:
+                        continue
+                    logging.info(f"Applying database migration {version}: {migration.__name__}")
+                    migration(connection, metadata)
+                    connection.execute(schema_version.insert().values(version=version))
+        finally:
+            if connection.dialect.name == 'sqlite':
+                connection.exec_driver_sql(f'PRAGMA busy_timeout={busy_timeout}')
+                connection.rollback()
+        return get_schema_version(connection)
@@ -0,0 +1,174 @@
+"""Run jobs at wall-clock times, sleeping until the earliest one is due.
+
+Jobs are keyed, so scheduling a key again replaces its pending run. ``Scheduler`` runs
+on its own thread and ``AsyncScheduler`` on an asyncio loop; both wake up as soon as a
+job is added or replaced instead of polling. Jobs that fall due together run as one
+batch on a bounded pool, and each batch's duration is recorded as ``scheduler.batch``.
+"""
+import asyncio
+import datetime
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import wait
+
+from includes import metrics
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# Re-check the clock at least this often, so wall-clock jumps (NTP, DST) are noticed
+MAX_SLEEP_SECONDS = 300
+
+
+def next_weekly_run(day: str, hour: int, now: datetime.datetime) -> datetime.datetime:
+    """Start of the next ``day``/``hour`` slot, or ``now`` while the current slot is still open"""
+    start = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    start += datetime.timedelta(days=(WEEKDAYS.index(day.lower()) - now.weekday()) % 7)
+    if now >= start + datetime.timedelta(hours=1):
+        start += datetime.timedelta(days=7)
+    return max(start, now)
+
+
+def week_key(when: datetime.datetime) -> str:
+    """ISO week such as ``2024-W07``; keys sort in chronological order"""
+    year, week, _ = when.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def month_key(when: datetime.datetime) -> str:
+    """Month such as ``2024-07``; keys sort in chronological order"""
+    return when.strftime("%Y-%m")
+
+
+class _JobHeap:
+    def __init__(self, now=datetime.datetime.now):
+        self.now = now
+        self._heap = []
+        self._jobs = {}  # key -> its live heap entry; replaced entries stay in the heap until popped
+        self._sequence = itertools.count()
+
+    def _push(self, key, run_at, job) -> None:
+        entry = (run_at, next(self._sequence), key, job)
+        self._jobs[key] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _pop_due(self) -> tuple:
+        """Remove and return the due jobs, with the seconds until the next one (None if idle)"""
+        now = self.now()
+        due = []
+        while self._heap:
+            entry = self._heap[0]
+            if self._jobs.get(entry[2]) is not entry:
+                heapq.heappop(self._heap)
+                continue
+            if entry[0] > now:
+                return due, (entry[0] - now).total_seconds()
+            heapq.heappop(self._heap)
+            del self._jobs[entry[2]]
+            due.append(entry[3])
+        return due, None
+
+    def next_run(self, key) -> datetime.datetime | None:
+        entry = self._jobs.get(key)
+        return entry[0] if entry else None
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+def _sleep_for(delay: float | None) -> float:
+    return MAX_SLEEP_SECONDS if delay is None else min(delay, MAX_SLEEP_SECONDS)
+
+
+class Scheduler(_JobHeap):
+    """Thread-based scheduler; ``schedule`` and ``cancel`` may be called from any thread.
+
+    With an ``executor`` the jobs of a batch run concurrently on it, otherwise one after another.
+    """
+
+    def __init__(self, now=datetime.datetime.now, executor=None):
+        super().__init__(now)
+        self.executor = executor
+        self._wakeup = threading.Condition()
+
+    def schedule(self, key, run_at: datetime.datetime, job) -> None:
+        with self._wakeup:
+            self._push(key, run_at, job)
+            self._wakeup.notify()
+
+    def cancel(self, key) -> None:
+        with self._wakeup:
+            self._jobs.pop(key, None)
+            self._wakeup.notify()
+
+    def _run(self, job) -> None:
+        try:
+            job()
+        except Exception as e:
+            logging.error(f"Error in scheduler: {e}")
+
+    def run_batch(self, jobs) -> None:
+        started = time.perf_counter()
+        if self.executor is None:
+            for job in jobs:
+                self._run(job)
+        else:
+            wait([self.executor.submit(self._run, job) for job in jobs])
+        metrics.increment("scheduler.jobs", len(jobs))
+        metrics.observe("scheduler.batch", time.perf_counter() - started)
+
+    def run_forever(self) -> None:
+        while True:
+            with self._wakeup:
+                due, delay = self._pop_due()
+                if not due:
+                    self._wakeup.wait(_sleep_for(delay))
+                    continue
+            self.run_batch(due)
+
+
+class AsyncScheduler(_JobHeap):
+    """asyncio scheduler; jobs are coroutine functions and ``schedule`` is called on the loop.
+
+    At most ``max_concurrency`` jobs of a batch are awaited at the same time.
+    """
+
+    def __init__(self, now=datetime.datetime.now, max_concurrency: int = 1):
+        super().__init__(now)
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    def schedule(self, key, run_at: datetime.datetime, job) -> None:
+        self._push(key, run_at, job)
+        self._wakeup.set()
+
+    def cancel(self, key) -> None:
+        self._jobs.pop(key, None)
+        self._wakeup.set()
+
+    async def _run(self, job) -> None:
+        async with self._slots:
+            try:
+                await job()
+            except Exception as e:
+                logging.error(f"Error in scheduler: {e}")
+
+    async def run_batch(self, jobs) -> None:
+        started = time.perf_counter()
+        await asyncio.gather(*(self._run(job) for job in jobs))
+        metrics.increment("scheduler.jobs", len(jobs))
+        metrics.observe("scheduler.batch", time.perf_counter() - started)
+
+    async def run_forever(self) -> None:
+        while True:
+            self._wakeup.clear()
+            due, delay = self._pop_due()
+            if not due:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), _sleep_for(delay))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.run_batch(due)
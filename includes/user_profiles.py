@@ -0,0 +1,40 @@
+"""Shared cache of Slack user objects, so admin checks and modal submissions skip users.info"""
+import os
+
+from includes import cache
+
+TTL_SECONDS = float(os.environ.get("USER_PROFILE_TTL_SECONDS", 3600))
+MAX_PROFILES = int(os.environ.get("USER_PROFILE_MAX_ENTRIES", 5000))
+
+_profiles = cache.TTLCache(MAX_PROFILES, TTL_SECONDS, name="user_profiles")
+
+
+def get_user_profile(client, user_id: str) -> dict:
+    """Return the ``user`` object from users.info, calling the API only on a cache miss"""
+    profile = _profiles.get(user_id)
+    if profile is None:
+        profile = client.users_info(user=user_id)["user"]
+        _profiles.set(user_id, profile)
+    return profile
+
+
+async def async_get_user_profile(client, user_id: str) -> dict:
+    profile = _profiles.get(user_id)
+    if profile is None:
+        profile = (await client.users_info(user=user_id))["user"]
+        _profiles.set(user_id, profile)
+    return profile
+
+
+def remember(user: dict) -> None:
+    """Store the fresh user object delivered with a ``user_change`` or ``team_join`` event"""
+    if user and user.get("id"):
+        _profiles.set(user["id"], user)
+
+
+def forget(user_id: str) -> None:
+    _profiles.pop(user_id)
+
+
+def stats() -> dict:
+    return _profiles.stats()
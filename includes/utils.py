@@ -1,43 +1,64 @@
+import re
 from typing import Any
 
-import main
 import logging
 
+from includes import user_profiles
+
 def parse_input(input_string):
+    """Parse ``@user amount`` pairs into a list of (user, amount).
+
+    Several users may share one amount, so ``@ann 5 @bob 3`` and ``@ann @bob 5`` both work.
+    """
     input_strings = str(input_string).strip().split()
-    
+
     # Check if input is empty
     if not input_strings:
         raise ValueError("Please provide a user and an amount (e.g., '@username 5')")
-    
-    # Check if both user and amount are provided
-    if len(input_strings) != 2:
+
+    entries = []
+    pending_users = []
+    for token in input_strings:
+        if token.startswith('@'):
+            pending_users.append(token[1:])  # Remove the @ symbol
+            continue
+
+        if not pending_users:
+            if not entries:
+                raise ValueError("User ID must start with '@' (e.g., '@username')")
+            raise ValueError(f"'{token}' has no user before it (e.g., '@username 5 @other 3')")
+        # Check if amount is a valid integer
+        try:
+            amount = int(token)
+        except ValueError:
+            raise ValueError(f"'{token}' is not a valid number. Amount must be a number.")
+        entries.extend((user_id, amount) for user_id in pending_users)
+        pending_users = []
+
+    # Check if every user got an amount
+    if pending_users:
         raise ValueError("Please provide both a user and an amount (e.g., '@username 5')")
-    
-    user_id = input_strings[0]
-    # Check if user ID starts with @
-    if not user_id.startswith('@'):
-        raise ValueError("User ID must start with '@' (e.g., '@username')")
-    user_id = user_id[1:]  # Remove the @ symbol
-    
-    amount = input_strings[1]
-    # Check if amount is a valid integer
-    try:
-        amount = int(amount)
-    except ValueError:
-        raise ValueError(f"'{amount}' is not a valid number. Amount must be a number.")
-    
-    return user_id, amount
 
+    return entries
 
-def is_workspace_admin(user_id):
-    try:
-        user_info = main.app.client.users_info(user=user_id)
-        is_admin = user_info["user"]["is_admin"]
-        is_owner = user_info["user"]["is_owner"]
-        is_primary_owner = user_info["user"]["is_primary_owner"]
 
-        return is_admin or is_owner or is_primary_owner
+def points_summary_text(results, removed=False) -> str:
+    """Fallback text for the message reporting a batch of (user, previous, amount, current)"""
+    direction = "removed from" if removed else "added to"
+    if len(results) == 1:
+        user_id, _, amount, _ = results[0]
+        return f"{amount} points have been {direction} <@{user_id}>"
+    total = sum(amount for _, _, amount, _ in results)
+    return f"{total} points have been {direction} {len(results)} users"
+
+
+def is_admin_profile(user: dict) -> bool:
+    return bool(user.get("is_admin") or user.get("is_owner") or user.get("is_primary_owner"))
+
+
+def is_workspace_admin(user_id, client):
+    try:
+        return is_admin_profile(user_profiles.get_user_profile(client, user_id))
     except Exception as e:
         print(f"Error checking workspace admin status: {e}")
         return False
@@ -64,11 +85,42 @@ def get_user_id(data: dict, data_type: str) -> str:
     return user_id
 
 
+def get_listener_name(body: dict) -> str:
+    """Name the command, view, shortcut, action or event a payload was sent for"""
+    if body.get("command"):
+        return body["command"]
+    if body.get("type") in ("view_submission", "view_closed"):
+        return body["view"]["callback_id"]
+    if body.get("actions"):
+        # toggle_item_<item>_<instance> -> toggle_item
+        return re.sub(r"(_\d+)+$", "", body["actions"][0]["action_id"])
+    if body.get("callback_id"):
+        return body["callback_id"]
+    if body.get("event"):
+        return body["event"]["type"]
+    return body.get("type", "unknown")
+
+
+def leaderboard_cursor(next_rank: int) -> str:
+    """Encode where the next leaderboard page starts as a button value"""
+    return str(next_rank)
+
+
+def split_leaderboard_page(user_points: list, page_size: int, start_rank: int) -> tuple:
+    """Trim rows fetched with ``page_size + 1`` to one page and return it with the next cursor"""
+    if len(user_points) <= page_size:
+        return user_points, None
+    return user_points[:page_size], leaderboard_cursor(start_rank + page_size)
+
+
+def parse_leaderboard_cursor(value: str | None) -> int:
+    """Return the position a cursor starts at, 1 for the first page"""
+    return int(value) if value else 1
+
+
 def format_time_difference(start_time, end_time):
-    """Format the difference between two ISO timestamps"""
-    start = datetime.datetime.fromisoformat(start_time)
-    end = datetime.datetime.fromisoformat(end_time)
-    delta = end - start
+    """Format the difference between two datetimes"""
+    delta = end_time - start_time
     
     hours, remainder = divmod(delta.seconds, 3600)
     minutes, seconds = divmod(remainder, 60)
@@ -3,15 +3,17 @@ import logging
 import os
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 import re
 from typing import List, Optional
 
-import schedule
 from dotenv import load_dotenv
-from slack_bolt import App
+from slack_bolt import App, BoltResponse
+from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry import RateLimitErrorRetryHandler
 
-from includes import custom_blocks, utils, db
+from includes import custom_blocks, dedup, dispatcher, export, metrics, scheduler, user_profiles, utils, db
 
 logging.basicConfig(
     level=logging.INFO,
@@ -24,46 +26,87 @@ logging.basicConfig(
 
 load_dotenv()
 
-last_reset_dates = {}
-
 app = App(
     token=os.environ.get("SLACK_BOT_TOKEN"),
     signing_secret=os.environ.get("SLACK_SIGNING_SECRET")
 )
 
+# On HTTP 429 wait out Slack's Retry-After and try again. This covers the calls listeners
+# make directly (views.open, users.info, ...); messages go through the outbox below.
+app.client.retry_handlers.append(RateLimitErrorRetryHandler(max_retry_count=2))
 
-def post_to_general(client, text: str, blocks: Optional[List[dict]] = None):
-    try:
-        message_payload = {
-            "channel": "debits-general",
-            "text": text,
-        }
-        if blocks:
-            message_payload["blocks"] = blocks
+# Slack retries a request that is not acknowledged within 3 seconds; warn well before that
+ACK_WARNING_SECONDS = 2.5
 
-        client.chat_postMessage(**message_payload)
 
-    except SlackApiError as e:
-        logging.error(f"Error posting message to general channel: {e.response['error']}")
+@app.middleware
+def stamp_received_at(context, next):
+    context["received_at"] = time.perf_counter()
+    next()
 
 
-def post_to_channel(client, channel_id: str, text: str, blocks: Optional[List[dict]] = None):
-    try:
-        message_payload = {
-            "channel": channel_id,
-            "text": text,
-        }
-        if blocks:
-            message_payload["blocks"] = blocks
+@app.middleware
+def skip_duplicate_deliveries(body, request, next):
+    """Answer Slack retries and duplicate deliveries without running any listener"""
+    key = dedup.get_delivery_key(body)
+    if key and not request.lazy_only and not dedup.claim(key):
+        retry_num = request.headers.get("x-slack-retry-num", ["0"])[0]
+        logging.info(f"Skipping duplicate delivery {key} (retry {retry_num})")
+        metrics.increment("dedup.skipped")
+        return BoltResponse(status=200, body="")
+    next()
 
-        client.chat_postMessage(**message_payload)
 
-    except SlackApiError as e:
-        logging.error(f"Error posting message to channel {channel_id}: {e.response['error']}")
-        try:
-            post_to_general(client, text, blocks)
-        except SlackApiError as e:
-            logging.error(f"Error posting message to general channel as fallback: {e.response['error']}")
+def acknowledge(ack, body, context):
+    """Ack-only listener shared by every command, shortcut, view and action.
+
+    The actual work is registered as a lazy listener and runs after the ack has
+    been sent, so database and Slack API calls never count against the 3-second window.
+    """
+    ack()
+    name = utils.get_listener_name(body)
+    latency = time.perf_counter() - context["received_at"]
+    metrics.observe(f"ack.{name}", latency)
+    if latency > ACK_WARNING_SECONDS:
+        logging.warning(f"Slow ack for {name}: {latency:.3f}s")
+
+
+# Messages are queued and sent by background workers within Slack's rate limits. The
+# dispatcher has its own client so a 429 is retried by the queue, not slept on in a worker.
+# There is one bot token, so "debits-general" is the same channel for every workspace's
+# reports, and they rightly share its one-message-per-second bucket.
+outbox = dispatcher.MessageDispatcher(WebClient(token=os.environ.get("SLACK_BOT_TOKEN")))
+
+
+def post_to_general(client, text: str, blocks: Optional[List[dict]] = None, wait_for_room: bool = False,
+                    on_sent=None) -> bool:
+    """Queue a message for #debits-general; return whether it was queued. ``client`` is not used.
+
+    Scheduled and system messages pass ``wait_for_room`` so a full queue holds them instead of dropping them.
+    ``on_sent`` is called with the response once the message has been posted.
+    """
+    message_payload = {
+        "text": text,
+    }
+    if blocks:
+        message_payload["blocks"] = blocks
+
+    return outbox.enqueue("chat_postMessage", "debits-general", wait_for_room=wait_for_room, on_sent=on_sent,
+                          **message_payload)
+
+
+def post_to_channel(client, channel_id: str, text: str, blocks: Optional[List[dict]] = None) -> bool:
+    """Queue a message for ``channel_id``, falling back to #debits-general if it cannot be posted"""
+    message_payload = {
+        "text": text,
+    }
+    if blocks:
+        message_payload["blocks"] = blocks
+
+    def post_to_general_instead(error):
+        post_to_general(client, text, blocks)
+
+    return outbox.enqueue("chat_postMessage", channel_id, on_error=post_to_general_instead, **message_payload)
 
 
 # SCHEDULING FUNCTIONS
@@ -73,71 +116,94 @@ def handle_message_events(body, logger):
     logger.info(body)
 
 
-@app.event("app_mention")
-def handle_app_mention(ack, body, say):
-    ack()
+def handle_user_profile_event(body):
+    """Refresh the cached profile whenever Slack reports a changed or newly joined user"""
+    user_profiles.remember(body["event"]["user"])
+
+
+app.event("user_change")(ack=acknowledge, lazy=[handle_user_profile_event])
+app.event("team_join")(ack=acknowledge, lazy=[handle_user_profile_event])
+
 
+def handle_app_mention(body, say):
     user = body["event"]["user"]
     block = custom_blocks.get_app_mention_block()
     say(blocks=block, text="Intro message")
 
 
-@app.command("/add")
-def handle_add_point_command(ack, body, client, say):
-    ack()
+app.event("app_mention")(ack=acknowledge, lazy=[handle_app_mention])
+
 
+def handle_add_point_command(body, client, say):
     text = body["text"]
     try:
-        target_user_id, amount = utils.parse_input(text)
+        entries = utils.parse_input(text)
         workspace_id = utils.get_workspace(body)
 
-        previous_amount, amount, current_amount = db.record_debit(target_user_id, workspace_id, int(amount))
-        blocks = custom_blocks.add_points_block(previous_amount, amount, current_amount, target_user_id)
-        post_to_general(client, f"{amount} points have been added to <@{target_user_id}>", blocks)
+        # Every pair goes through one bulk upsert and is reported in one message
+        results = db.record_debits(workspace_id, entries, actor=body["user_id"])
+        blocks = custom_blocks.points_summary_blocks(results)
+        post_to_general(client, utils.points_summary_text(results), blocks)
     except ValueError as e:
         # Return a helpful error message to the user
         error_message = f"Error: {str(e)}"
         post_to_general(client, error_message)
 
 
-@app.command("/delete")
-def handle_remove_point_command(ack, body, say):
-    ack()
+app.command("/add")(ack=acknowledge, lazy=[handle_add_point_command])
 
-    channel_id = utils.get_workspace(body)
+
+def handle_remove_point_command(body, client):
     text = body["text"]
-    target_user_id, amount = utils.parse_input(text)
-    workspace_id = utils.get_workspace(body)
-    if target_user_id:
-        previous_amount, amount, current_amount = db.remove_debit(target_user_id, workspace_id, int(amount))
-        blocks = custom_blocks.remove_points_block(previous_amount, amount, current_amount, target_user_id)
-        post_to_general(client, f"{amount} points have been removed from {target_user_id}", blocks)
-        # post_to_channel(client, channel_id, f"{amount} points have been added to {target_user_id}", blocks)
+    try:
+        entries = utils.parse_input(text)
+        workspace_id = utils.get_workspace(body)
 
+        results = db.remove_debits(workspace_id, entries, actor=body["user_id"])
+        blocks = custom_blocks.points_summary_blocks(results, removed=True)
+        post_to_general(client, utils.points_summary_text(results, removed=True), blocks)
+    except ValueError as e:
+        post_to_general(client, f"Error: {str(e)}")
+
+
+app.command("/delete")(ack=acknowledge, lazy=[handle_remove_point_command])
 
-@app.command("/points")
-def handle_points_command(ack, client, body):
-    ack()
 
+def get_leaderboard_page(workspace_id: str, cursor: Optional[str] = None,
+                         page_size: int = custom_blocks.LEADERBOARD_PAGE_SIZE):
+    """Fetch one leaderboard page; returns its rows, the rank of the first row and the next cursor"""
+    start_rank = utils.parse_leaderboard_cursor(cursor)
+    user_points = db.get_leaderboard(workspace_id, page_size + 1, start_rank - 1)
+    user_points, next_page = utils.split_leaderboard_page(user_points, page_size, start_rank)
+    return user_points, start_rank, next_page
+
+
+def handle_points_command(client, body):
     text = body["text"]
     if text:
         workspace_id = utils.get_workspace(body)
-        user_id = text.replace("@", "")
-        user, amount = db.get_single_user(user_id, workspace_id)
-        response_text = f"<@{user}>: {int(amount)}"
+        user_id = text.strip().replace("@", "")
+        ranked = db.get_user_rank(user_id, workspace_id)
+        if ranked:
+            response_text = f"<@{ranked.user}>: {int(ranked.amount)} (rank {ranked.rank})"
+        else:
+            response_text = f"<@{user_id}> has no points yet."
         post_to_general(client, response_text)
 
     else:
         workspace_id = utils.get_workspace(body)
-        user_points = db.get_all_points(workspace_id)
+        user_points, start_rank, next_page = get_leaderboard_page(workspace_id)
         if user_points:
-            blocks = custom_blocks.user_points_blocks(user_points)
+            blocks = custom_blocks.user_points_blocks(user_points, start_rank, next_page)
             post_to_general(client, "Debit Points", blocks)
 
         else:
             post_to_general(client, "No user points found in the database.")
 
 
+app.command("/points")(ack=acknowledge, lazy=[handle_points_command])
+
+
 def get_permalink(channel, timestamp):
     client = app.client
     response = client.chat_getPermalink(
@@ -147,10 +213,7 @@ def get_permalink(channel, timestamp):
     return response["permalink"]
 
 
-@app.shortcut("add_point")
-def handle_add_a_point_shortcut(ack, body):
-    ack()
-
+def handle_add_a_point_shortcut(body, client):
     timestamp = body["message"]["ts"]
     channel_id = body["channel"]["id"]
     trigger_id = body["trigger_id"]
@@ -159,10 +222,10 @@ def handle_add_a_point_shortcut(ack, body):
     client.views_open(trigger_id=trigger_id, view=blocks)
 
 
-@app.shortcut("remove_point")
-def handle_remove_point_shortcut(ack, body):
-    ack()
+app.shortcut("add_point")(ack=acknowledge, lazy=[handle_add_a_point_shortcut])
+
 
+def handle_remove_point_shortcut(body, client):
     timestamp = body["message"]["ts"]
     channel_id = body["channel"]["id"]
     trigger_id = body["trigger_id"]
@@ -171,63 +234,87 @@ def handle_remove_point_shortcut(ack, body):
     client.views_open(trigger_id=trigger_id, view=blocks)
 
 
-@app.view("remove_modal_save")
-def handle_remove_submission_events(ack, body, client):
-    ack()
+app.shortcut("remove_point")(ack=acknowledge, lazy=[handle_remove_point_shortcut])
+
 
+def handle_remove_submission_events(body, client):
     workspace_id = utils.get_workspace(body)
-    selected_user = body["view"]["state"]["values"]["user"]["multi_users_select-action"]["selected_users"][0]
-    userprofile = client.users_info(user=selected_user)
-    username = userprofile["user"]["name"]
+    selected_users = body["view"]["state"]["values"]["user"]["multi_users_select-action"]["selected_users"]
+    usernames = [user_profiles.get_user_profile(client, user_id)["name"] for user_id in selected_users]
     points = body["view"]["state"]["values"]["points"]["plain_text_input-action"]["value"]
     timestamp_link = body["view"]["state"]["values"]["timestamp"]["timestamp_input"]["value"]
-    previous_amount, amount, current_amount = db.remove_debit(username, workspace_id, int(points), timestamp_link)
-    blocks = custom_blocks.remove_points_block(previous_amount, amount, current_amount, username, link=timestamp_link)
+    results = db.remove_debits(
+        workspace_id, [(username, int(points)) for username in usernames], timestamp_link, actor=body["user"]["id"]
+    )
+    blocks = custom_blocks.points_summary_blocks(results, removed=True, link=timestamp_link)
     ts_link = timestamp_link.split('archives/')[1]
     channel_id = ts_link.split('/')[0]
-    text = f"{amount} points have been removed from <@{username}>"
+    text = utils.points_summary_text(results, removed=True)
     post_to_general(client, text, blocks)
     # post_to_channel(client, channel_id, text, blocks)
 
 
-@app.view("add_modal_save")
-def handle_add_submission_events(ack, body, say):
-    ack()
+app.view("remove_modal_save")(ack=acknowledge, lazy=[handle_remove_submission_events])
+
 
+def handle_add_submission_events(body, say, client):
     workspace_id = utils.get_workspace(body)
-    selected_user = body["view"]["state"]["values"]["user"]["multi_users_select-action"]["selected_users"][0]
-    userprofile = client.users_info(user=selected_user)
-    username = userprofile["user"]["name"]
+    selected_users = body["view"]["state"]["values"]["user"]["multi_users_select-action"]["selected_users"]
+    usernames = [user_profiles.get_user_profile(client, user_id)["name"] for user_id in selected_users]
     points = body["view"]["state"]["values"]["points"]["plain_text_input-action"]["value"]
     timestamp_link = body["view"]["state"]["values"]["timestamp"]["timestamp_input"]["value"]
-    previous_amount, amount, current_amount = db.record_debit(username, workspace_id, int(points), timestamp_link)
-    blocks = custom_blocks.add_points_block(previous_amount, amount, current_amount, username, link=timestamp_link)
+    results = db.record_debits(
+        workspace_id, [(username, int(points)) for username in usernames], timestamp_link, actor=body["user"]["id"]
+    )
+    blocks = custom_blocks.points_summary_blocks(results, link=timestamp_link)
     ts_link = timestamp_link.split('archives/')[1]
     channel_id = ts_link.split('/')[0]
-    text = f"{amount} points have been added to <@{username}>"
+    text = utils.points_summary_text(results)
     post_to_general(client, text, blocks)
     # post_to_channel(client, channel_id, text, blocks)
 
 
-@app.shortcut("all_points")
-def handle_all_points_shortcut(ack, body):
-    ack()
+app.view("add_modal_save")(ack=acknowledge, lazy=[handle_add_submission_events])
+
 
+def handle_all_points_shortcut(body, client):
     workspace_id = utils.get_workspace(body)
-    user_points = db.get_all_points(workspace_id)
+    user_points, start_rank, next_page = get_leaderboard_page(workspace_id)
     if user_points:
-        blocks = custom_blocks.user_points_blocks(user_points)
+        blocks = custom_blocks.user_points_blocks(user_points, start_rank, next_page)
         post_to_general(client, "Debit Points", blocks)
     else:
         post_to_general(client, "No user points found in the database.")
 
 
+app.shortcut("all_points")(ack=acknowledge, lazy=[handle_all_points_shortcut])
+
+
+def handle_leaderboard_page(body, client):
+    workspace_id = utils.get_workspace(body)
+    cursor = body["actions"][0]["value"]
+    user_points, start_rank, next_page = get_leaderboard_page(workspace_id, cursor)
+    if user_points:
+        channel_id = body["channel"]["id"]
+        message_ts = body["message"]["ts"]
+        # Queued like every other message; clicking through pages quickly only sends the last one
+        outbox.enqueue(
+            "chat_update",
+            channel_id,
+            coalesce_key=("chat_update", channel_id, message_ts),
+            ts=message_ts,
+            text="Debit Points",
+            blocks=custom_blocks.user_points_blocks(user_points, start_rank, next_page)
+        )
+
+
+app.action(re.compile("leaderboard_(first|next)_page"))(ack=acknowledge, lazy=[handle_leaderboard_page])
+
+
 # SCHEDULING COMMAND
 
 
-@app.command("/set-reset-mode")
-def handle_set_reset_mode(ack, body, respond):
-    ack()
+def handle_set_reset_mode(body, respond):
     workspace_id = utils.get_workspace(body)
     mode = body["text"].strip().lower()
     if mode in ["automatic", "manual"]:
@@ -237,52 +324,80 @@ def handle_set_reset_mode(ack, body, respond):
         respond("Invalid mode. Please enter 'automatic' or 'manual'.")
 
 
-@app.command("/reset")
-def handle_reset_command(ack, body, respond):
-    ack()
+app.command("/set-reset-mode")(ack=acknowledge, lazy=[handle_set_reset_mode])
+
+
+def handle_reset_command(body, client, respond):
     user_id = utils.get_user_id(body, "body")
-    if utils.is_workspace_admin(user_id):
+    if utils.is_workspace_admin(user_id, client):
         trigger_id = body["trigger_id"]
         blocks = custom_blocks.reset_db_modal_blocks()
-        client = app.client
         client.views_open(trigger_id=trigger_id, view=blocks)
     else:
         respond("Command reserved for admin")
 
 
-@app.command("/create-checklist")
-def handle_create_checklist_command(ack, body, client):
-    """Command handler for /create-checklist"""
-    ack()
+app.command("/reset")(ack=acknowledge, lazy=[handle_reset_command])
+
 
+def handle_export_command(body, client, respond):
+    """Upload a workspace's debits, ledger or checklist history as CSV or NDJSON files"""
+    user_id = utils.get_user_id(body, "body")
+    if not utils.is_workspace_admin(user_id, client):
+        respond("Command reserved for admin")
+        return
+    try:
+        dataset, fmt = export.parse_command(body["text"])
+    except ValueError as e:
+        respond(f"Error: {str(e)}")
+        return
+
+    workspace_id = utils.get_workspace(body)
+    try:
+        parts = export.upload(client, body["channel_id"], dataset, workspace_id, fmt)
+    except SlackApiError as e:
+        logging.error(f"Error uploading {dataset} export: {e.response['error']}")
+        respond(f"The {dataset} export could not be uploaded.")
+        return
+    if not parts:
+        respond(f"There is no {dataset} data to export.")
+
+
+app.command("/export")(ack=acknowledge, lazy=[handle_export_command])
+
+
+def handle_create_checklist_command(body, client):
+    """Command handler for /create-checklist"""
     trigger_id = body["trigger_id"]
     blocks = custom_blocks.create_checklist_modal()
     client.views_open(trigger_id=trigger_id, view=blocks)
 
 
-@app.shortcut("open_create_checklist")
-def handle_create_checklist_shortcut(ack, body, client):
-    """Global shortcut handler to open the create checklist modal"""
-    ack()
+app.command("/create-checklist")(ack=acknowledge, lazy=[handle_create_checklist_command])
+
 
+def handle_create_checklist_shortcut(body, client):
+    """Global shortcut handler to open the create checklist modal"""
     trigger_id = body["trigger_id"]
     blocks = custom_blocks.create_checklist_modal()
     client.views_open(trigger_id=trigger_id, view=blocks)
 
 
-@app.shortcut("view_checklists")
-def handle_view_checklists_shortcut(ack, body, client):
-    """Global shortcut handler to view all checklists"""
-    ack()
+app.shortcut("open_create_checklist")(ack=acknowledge, lazy=[handle_create_checklist_shortcut])
 
+
+def handle_view_checklists_shortcut(body, client):
+    """Global shortcut handler to view all checklists"""
     workspace_id = utils.get_workspace(body)
     checklists = db.get_all_checklists(workspace_id)
     modal = custom_blocks.view_checklists_modal(checklists)
     client.views_open(trigger_id=body["trigger_id"], view=modal)
 
 
-@app.view("create_checklist")
-def handle_create_checklist_submission(ack, body, client):
+app.shortcut("view_checklists")(ack=acknowledge, lazy=[handle_view_checklists_shortcut])
+
+
+def handle_create_checklist_submission(body, client):
     """Handle submission of the create checklist modal"""
     # Extract the values
     checklist_name = body["view"]["state"]["values"]["checklist_name"]["checklist_name_input"]["value"]
@@ -295,10 +410,6 @@ def handle_create_checklist_submission(ack, body, client):
     
     # Create the checklist
     success = db.create_checklist(checklist_name, workspace_id, user_id, items)
-    
-    # Acknowledge the submission
-    ack()
-    
     # Send a confirmation message to the user
     if success:
         try:
@@ -320,11 +431,11 @@ def handle_create_checklist_submission(ack, body, client):
             logging.error(f"Error sending error message: {e}")
 
 
-@app.command("/checklist")
-def handle_checklist_command(ack, body, client, say):
-    """Command handler for /checklist"""
-    ack()
+app.view("create_checklist")(ack=acknowledge, lazy=[handle_create_checklist_submission])
 
+
+def handle_checklist_command(body, client, say):
+    """Command handler for /checklist"""
     channel_id = body["channel_id"]
     workspace_id = utils.get_workspace(body)
     command_text = body["text"].strip()
@@ -368,10 +479,7 @@ def handle_checklist_command(ack, body, client, say):
     # Update the instance with the real message timestamp
     if response["ok"]:
         message_ts = response["ts"]
-        with db.Session() as session:
-            inst = session.query(db.ChecklistInstance).filter_by(id=instance_id).first()
-            inst.message_ts = message_ts
-            session.commit()
+        db.set_checklist_instance_message_ts(instance_id, message_ts)
 
         # Notify mentioned users
         for user in mentioned_users:
@@ -385,11 +493,11 @@ def handle_checklist_command(ack, body, client, say):
                 logging.error(f"Error notifying user {user}: {e}")
 
 
-@app.action("view_checklist_button")
-def handle_view_checklist_button(ack, body, client):
-    """Handle clicks on the view button for checklist listings"""
-    ack()
+app.command("/checklist")(ack=acknowledge, lazy=[handle_checklist_command])
+
 
+def handle_view_checklist_button(body, client):
+    """Handle clicks on the view button for checklist listings"""
     action = body.get("actions", [{}])[0]
     checklist_name = action.get("value")
     user_id = body.get("user", {}).get("id")
@@ -447,23 +555,17 @@ def handle_view_checklist_button(ack, body, client):
 
     if response.get("ok"):
         message_ts = response.get("ts")
-        try:
-            with db.Session() as session:
-                instance = session.query(db.ChecklistInstance).filter_by(id=instance_id).first()
-                if instance and message_ts:
-                    instance.message_ts = message_ts
-                    session.commit()
-        except Exception as e:
-            logging.error(f"Error updating checklist instance timestamp: {e}")
+        if message_ts:
+            db.set_checklist_instance_message_ts(instance_id, message_ts)
     else:
         notify_user("Failed to post the checklist to the channel.")
 
 
-@app.command("/delete-checklist")
-def handle_delete_checklist_command(ack, body, client):
+app.action("view_checklist_button")(ack=acknowledge, lazy=[handle_view_checklist_button])
+
+
+def handle_delete_checklist_command(body, client):
     """Command handler for /delete-checklist"""
-    ack()
-    
     workspace_id = utils.get_workspace(body)
     user_id = utils.get_user_id(body, "body")
     
@@ -482,11 +584,15 @@ def handle_delete_checklist_command(ack, body, client):
     client.views_open(trigger_id=body["trigger_id"], view=blocks)
 
 
-@app.action(re.compile("toggle_item_(.*)"))
-def handle_item_toggle(ack, body, client):
+app.command("/delete-checklist")(ack=acknowledge, lazy=[handle_delete_checklist_command])
+
+
+# Checkbox clicks within this window are rendered by a single chat.update
+CHECKLIST_UPDATE_DEBOUNCE_SECONDS = 1.0
+
+
+def handle_item_toggle(body, client):
     """Handle checkbox actions for checklist items"""
-    ack()
-    
     try:
         # Extract action details
         action_id = body["actions"][0]["action_id"]
@@ -501,105 +607,54 @@ def handle_item_toggle(ack, body, client):
         instance_id = parts[3]
         user_id = body["user"]["id"]
         
-        # Update the item status
-        result = db.update_checklist_item(int(instance_id), int(item_id), selected, user_id)
-        if not result:
-            logging.error("Failed to update checklist item")
-            return
-            
-        # Get updated instance data
-        instance_data = db.get_checklist_instance(int(instance_id))
+        # Update the item status; the updated instance comes back ready to render
+        instance_data = db.update_checklist_item(int(instance_id), int(item_id), selected, user_id)
         if not instance_data:
-            logging.error(f"No instance data found for instance_id: {instance_id}")
+            logging.error(f"Failed to update checklist item {item_id} of instance {instance_id}")
             return
 
-        # Format timestamps
-        def format_timestamp(ts):
-            if not ts:
-                return None
-            try:
-                return datetime.datetime.fromisoformat(ts).strftime('%b %d at %I:%M %p')
-            except (ValueError, TypeError):
-                return None
+        created_at = custom_blocks.format_timestamp(instance_data.get('created_at'))
+        completed_at = custom_blocks.format_timestamp(instance_data.get('completed_at'))
 
-        created_at = format_timestamp(instance_data.get('created_at'))
-        completed_at = format_timestamp(instance_data.get('completed_at'))
-        
         # Calculate time taken if both timestamps exist
         time_str = "Time information not available"
         if instance_data.get('created_at') and instance_data.get('completed_at'):
             try:
-                start = datetime.datetime.fromisoformat(instance_data['created_at'])
-                end = datetime.datetime.fromisoformat(instance_data['completed_at'])
-                delta = end - start
-                
-                hours, remainder = divmod(delta.seconds, 3600)
-                minutes, seconds = divmod(remainder, 60)
-                
-                if delta.days > 0:
-                    time_str = f"{delta.days} days, {hours} hours"
-                elif hours > 0:
-                    time_str = f"{hours} hours, {minutes} minutes"
-                elif minutes > 0:
-                    time_str = f"{minutes} minutes, {seconds} seconds"
-                else:
-                    time_str = f"{seconds} seconds"
+                time_str = utils.format_time_difference(instance_data['created_at'], instance_data['completed_at'])
             except (ValueError, TypeError):
                 pass
 
-        # Update the checklist message
-        client.chat_update(
-            channel=body["channel"]["id"],
-            ts=body["message"]["ts"],
-            blocks=custom_blocks.render_checklist_instance(instance_data),
-            text=f"Checklist: {instance_data.get('name', 'Unnamed Checklist')}"
+        channel_id = body["channel"]["id"]
+        message_ts = body["message"]["ts"]
+
+        def render_update():
+            # Rendered when the update is sent, so the last one always shows the latest state
+            latest = db.get_checklist_instance(int(instance_id)) or instance_data
+            return {
+                "blocks": custom_blocks.render_checklist_instance(latest),
+                "text": f"Checklist: {latest.get('name', 'Unnamed Checklist')}"
+            }
+
+        # Update the checklist message; rapid clicks on one message collapse into one update
+        outbox.enqueue(
+            "chat_update",
+            channel_id,
+            coalesce_key=("chat_update", channel_id, message_ts),
+            delay=CHECKLIST_UPDATE_DEBOUNCE_SECONDS,
+            render=render_update,
+            ts=message_ts
         )
 
         # Send completion message if all items are complete
-        if result.get("all_complete", False):
-            completion_blocks = [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": f"✅ *Checklist \"{instance_data.get('name', 'Unnamed Checklist')}\" has been completed!*"
-                    }
-                },
-                {
-                    "type": "context",
-                    "elements": [
-                        {
-                            "type": "mrkdwn",
-                            "text": f"⏱️ Time taken: {time_str}"
-                        }
-                    ]
-                }
-            ]
-            
-            if created_at:
-                completion_blocks.append({
-                    "type": "context",
-                    "elements": [
-                        {
-                            "type": "mrkdwn",
-                            "text": f"🕒 Started: {created_at}"
-                        }
-                    ]
-                })
-            
-            if completed_at:
-                completion_blocks.append({
-                    "type": "context",
-                    "elements": [
-                        {
-                            "type": "mrkdwn",
-                            "text": f"🏁 Completed: {completed_at}"
-                        }
-                    ]
-                })
-
-            client.chat_postMessage(
-                channel=body["channel"]["id"],
+        if selected and instance_data["is_complete"]:
+            completion_blocks = custom_blocks.checklist_completed_blocks(
+                instance_data.get('name', 'Unnamed Checklist'), time_str, created_at, completed_at
+            )
+
+            # Queued behind the checklist update for the same channel, so it is posted after it
+            outbox.enqueue(
+                "chat_postMessage",
+                channel_id,
                 blocks=completion_blocks,
                 text=f"Checklist completed in {time_str}!"
             )
@@ -607,8 +662,10 @@ def handle_item_toggle(ack, body, client):
     except Exception as e:
         logging.error(f"Error in handle_item_toggle: {e}")
 
-@app.view("delete_checklist")
-def handle_delete_checklist_submission(ack, body, client):
+
+app.action(re.compile("toggle_item_(.*)"))(ack=acknowledge, lazy=[handle_item_toggle])
+
+def handle_delete_checklist_submission(body, client):
     """Handle submission of the delete checklist modal"""
     # Extract the values
     selected_checklist = body["view"]["state"]["values"]["checklist_select"]["checklist_select_action"]["selected_option"]["value"]
@@ -617,10 +674,6 @@ def handle_delete_checklist_submission(ack, body, client):
 
     # Delete the checklist
     success = db.delete_checklist(selected_checklist, workspace_id)
-
-    # Acknowledge the submission
-    ack()
-
     # Send a confirmation message to the user
     if success:
         try:
@@ -642,17 +695,19 @@ def handle_delete_checklist_submission(ack, body, client):
             logging.error(f"Error sending error message: {e}")
 
 
-@app.view("reset")
-def handle_reset_view(ack, body, client):
-    ack()
+app.view("delete_checklist")(ack=acknowledge, lazy=[handle_delete_checklist_submission])
+
+
+def handle_reset_view(body, client):
     workspace_id = utils.get_workspace(body)
-    db.reset_debits_table(workspace_id)
+    db.reset_debits_table(workspace_id, actor=body["user"]["id"])
     post_to_general(client, "The database was successfully reset.")
 
 
-@app.command("/set-report-day")
-def handle_set_report_day(ack, body, respond):
-    ack()
+app.view("reset")(ack=acknowledge, lazy=[handle_reset_view])
+
+
+def handle_set_report_day(body, respond):
     workspace_id = utils.get_workspace(body)
     text = body["text"].strip().lower()
 
@@ -664,6 +719,7 @@ def handle_set_report_day(ack, body, respond):
         if day in valid_days:
             if 0 <= time_hour < 24:
                 db.set_report_daytime(workspace_id, day, time_hour)
+                schedule_weekly_report(workspace_id, day, time_hour)
                 respond(f"Weekly report day set to {day.capitalize()} at {time_hour:02d}:00.")
             else:
                 respond("Invalid time. Please enter a valid hour (0-23).")
@@ -675,65 +731,159 @@ def handle_set_report_day(ack, body, respond):
         respond(f"An error occurred: {e}. Please try again later.")
 
 
-def send_weekly_report(workspace_id: str):
+app.command("/set-report-day")(ack=acknowledge, lazy=[handle_set_report_day])
+
+
+def send_weekly_report(workspace_id: str, on_sent=None) -> bool:
+    """Queue the workspace's report, one message per page; return False if it has to be sent again.
+
+    ``on_sent`` is called once the last page has been posted.
+    """
     client = app.client
-    user_points = db.get_all_points(workspace_id)
-    if user_points:
-        try:
-            blocks = custom_blocks.user_points_blocks(user_points)
-            post_to_general(client, "Weekly Debit Points Update", blocks)
-        except Exception as e:
-            logging.error(f"Error sending weekly report: {e}")
-    else:
+    user_points, start_rank, next_page = get_leaderboard_page(workspace_id, page_size=custom_blocks.REPORT_PAGE_SIZE)
+    if not user_points:
         logging.error("No user points found in the database")
+        return True
+
+    # One message per page; large workspaces get several consecutive messages
+    try:
+        blocks = custom_blocks.user_points_blocks(user_points, start_rank)
+        if not post_to_general(client, "Weekly Debit Points Update", blocks, wait_for_room=True,
+                               on_sent=None if next_page else on_sent):
+            return False
+        while next_page:
+            user_points, start_rank, next_page = get_leaderboard_page(
+                workspace_id, next_page, custom_blocks.REPORT_PAGE_SIZE)
+            if not user_points:
+                break
+            blocks = custom_blocks.user_points_blocks(user_points, start_rank, header=False)
+            if not post_to_general(client, "Weekly Debit Points Update (continued)", blocks,
+                                   wait_for_room=True, on_sent=None if next_page else on_sent):
+                return False
+    except Exception as e:
+        logging.error(f"Error sending weekly report: {e}")
+        return False
+    return True
 
 
-def run_scheduler():
-    def send_report_job():
-        logging.info("Checking Report Job")
-        client = app.client
-        reports_daytime = db.get_report_daytime()
-        if reports_daytime:
-            for report_daytime in reports_daytime:
-                day = report_daytime.day
-                time_hour = report_daytime.hour
-                workspace_id = report_daytime.workspace
-                if day == datetime.datetime.today().strftime('%A') and datetime.datetime.now().hour == time_hour:
-                    send_weekly_report(workspace_id)
-        else:
-            logging.info('No report in database')
-
-    def check_reset_mode():
-        global last_reset_dates
-        client = app.client
-        today = datetime.datetime.now()
-        reset_modes = db.get_reset_mode()
-
-        if reset_modes:
-            for reset_mode in reset_modes:
-                workspace_id = reset_mode.workspace
-                # Create a key for the current year and month
-                current_month_key = f"{workspace_id}_{today.year}_{today.month}"
-
-                # Only reset if mode is automatic, it's the first day of the month, 
-                # and we haven't already reset for this month
-                if (reset_mode.reset_mode == "automatic" and today.day == 1 and current_month_key not in last_reset_dates):
-
-                    db.reset_debits_table(workspace_id)
-                    post_to_general(client, "Database Reset Successful")
-
-                    # Mark that we've reset for this month
-                    last_reset_dates[current_month_key] = True
-                    logging.info(f"Automatic reset performed for workspace {workspace_id}")
+# Jobs that fall due together (e.g. every report set for the same hour) run on this many workers
+REPORT_WORKERS = int(os.environ.get("REPORT_WORKERS", 8))
+# A report that could not be queued is tried again this much later, while its hour lasts
+REPORT_RETRY_SECONDS = 300
+
+job_scheduler = scheduler.Scheduler(
+    executor=ThreadPoolExecutor(max_workers=REPORT_WORKERS, thread_name_prefix="scheduler")
+)
+
+# Reload every schedule this often so changes made through another process are picked up
+SCHEDULE_REFRESH_SECONDS = 900
+
+# Log the counters, timings and cache stats of includes.metrics this often
+METRICS_LOG_SECONDS = int(os.environ.get("METRICS_LOG_SECONDS", 300))
+
+# Last (day, hour) armed per workspace
+report_schedules = {}
+
+
+def schedule_weekly_report(workspace_id: str, day: str, hour: int, now: Optional[datetime.datetime] = None):
+    """Arm (or re-arm) the workspace's next weekly report; the scheduler wakes up immediately"""
+    run_at = scheduler.next_weekly_run(day, hour, now or datetime.datetime.now())
+    report_schedules[workspace_id] = (day, hour)
+    job_scheduler.schedule(f"report:{workspace_id}", run_at, lambda: run_weekly_report(workspace_id, day, hour))
+
+
+def run_weekly_report(workspace_id: str, day: str, hour: int):
+    now = datetime.datetime.now()
+    # An hour from now is past this week's slot, so the job is re-armed for next week
+    next_week = now + datetime.timedelta(hours=1)
+
+    week = scheduler.week_key(now)
+    if db.claim_weekly_report(workspace_id, day, hour, week):
+        started = time.perf_counter()
+
+        def report_posted(response):
+            # Timed until Slack has the last page, including the wait in the outbox
+            metrics.observe("report.workspace", time.perf_counter() - started)
+
+        sent = send_weekly_report(workspace_id, on_sent=report_posted)
+        if sent:
+            schedule_weekly_report(workspace_id, day, hour, next_week)
         else:
-            logging.info('No mode in database')
+            # Give the week back so this or another process can send it
+            metrics.increment("report.failed")
+            db.release_weekly_report(workspace_id, week)
+            schedule_weekly_report(workspace_id, day, hour, now + datetime.timedelta(seconds=REPORT_RETRY_SECONDS))
+        return
+
+    # Already sent this week, or the schedule was changed through another process
+    report_schedule = db.get_report_schedule(workspace_id)
+    if report_schedule is None:
+        report_schedules.pop(workspace_id, None)
+    elif (report_schedule.day, report_schedule.hour) == (day, hour):
+        schedule_weekly_report(workspace_id, day, hour, next_week)
+    else:
+        schedule_weekly_report(workspace_id, report_schedule.day, report_schedule.hour)
+
+
+def refresh_report_schedules():
+    run_at = datetime.datetime.now() + datetime.timedelta(seconds=SCHEDULE_REFRESH_SECONDS)
+    job_scheduler.schedule("refresh_report_schedules", run_at, refresh_report_schedules)
+
+    reports_daytime = db.get_report_daytime()
+    if reports_daytime:
+        for report_daytime in reports_daytime:
+            workspace_id = report_daytime.workspace
+            changed = report_schedules.get(workspace_id) != (report_daytime.day, report_daytime.hour)
+            if changed or job_scheduler.next_run(f"report:{workspace_id}") is None:
+                schedule_weekly_report(workspace_id, report_daytime.day, report_daytime.hour)
+    else:
+        logging.info('No report in database')
 
-    schedule.every().minutes.do(send_report_job)
-    schedule.every().day.at("00:01").do(check_reset_mode)
 
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+def check_reset_mode():
+    """Reset every automatic workspace once per month, catching up on months missed while down"""
+    client = app.client
+    period = scheduler.month_key(datetime.datetime.now())
+    reset_modes = db.get_reset_mode()
+
+    if reset_modes:
+        for reset_mode in reset_modes:
+            workspace_id = reset_mode.workspace
+            if reset_mode.reset_mode == "automatic" and db.reset_debits_for_period(workspace_id, period):
+                post_to_general(client, "Database Reset Successful", wait_for_room=True)
+                logging.info(f"Automatic reset performed for workspace {workspace_id}")
+    else:
+        logging.info('No mode in database')
+
+
+def schedule_reset_check(run_at: Optional[datetime.datetime] = None):
+    """Run check_reset_mode at ``run_at`` and from then on every day at 00:01"""
+    if run_at is None:
+        now = datetime.datetime.now()
+        run_at = now.replace(hour=0, minute=1, second=0, microsecond=0)
+        if run_at <= now:
+            run_at += datetime.timedelta(days=1)
+
+    def job():
+        schedule_reset_check()
+        check_reset_mode()
+
+    job_scheduler.schedule("reset_check", run_at, job)
+
+
+def log_metrics():
+    run_at = datetime.datetime.now() + datetime.timedelta(seconds=METRICS_LOG_SECONDS)
+    job_scheduler.schedule("log_metrics", run_at, log_metrics)
+    logging.info("Metrics:\n" + metrics.format_snapshot(metrics.snapshot()))
+
+
+def run_scheduler():
+    job_scheduler.schedule("refresh_report_schedules", datetime.datetime.now(), refresh_report_schedules)
+    # Check straight away so a reset missed while the app was down is caught up
+    schedule_reset_check(datetime.datetime.now())
+    job_scheduler.schedule("log_metrics", datetime.datetime.now() + datetime.timedelta(seconds=METRICS_LOG_SECONDS),
+                           log_metrics)
+    job_scheduler.run_forever()
 
 
 if __name__ == "__main__":
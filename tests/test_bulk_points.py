@@ -0,0 +1,59 @@
+"""Parsing ``/add`` and ``/remove`` text for many users and summarizing the batch in one message."""
+import pytest
+
+from includes import custom_blocks, utils
+
+
+def test_each_user_takes_the_next_amount():
+    assert utils.parse_input("@ann 5") == [("ann", 5)]
+    assert utils.parse_input("  @ann 5 @bob -3\t@cat 0 ") == [("ann", 5), ("bob", -3), ("cat", 0)]
+
+
+def test_users_before_one_amount_share_it():
+    assert utils.parse_input("@ann @bob 5 @cat 2") == [("ann", 5), ("bob", 5), ("cat", 2)]
+    # The same user twice is kept twice; the writes sum them
+    assert utils.parse_input("@ann 1 @ann 2") == [("ann", 1), ("ann", 2)]
+
+
+@pytest.mark.parametrize("text, message", [
+    ("", "Please provide a user and an amount"),
+    (None, "User ID must start with '@'"),
+    ("5 @ann", "User ID must start with '@'"),
+    ("@ann 5 3", "'3' has no user before it"),
+    ("@ann five", "'five' is not a valid number"),
+    ("@ann 2.5", "'2.5' is not a valid number"),
+    ("@ann 5 @bob", "Please provide both a user and an amount"),
+])
+def test_malformed_input_is_rejected(text, message):
+    with pytest.raises(ValueError, match=message):
+        utils.parse_input(text)
+
+
+def _results(count):
+    return [(f"U{i}", i, 1, i + 1) for i in range(count)]
+
+
+def test_small_batch_lists_every_user():
+    blocks = custom_blocks.points_summary_blocks(_results(12))
+
+    assert blocks[0]["text"]["text"] == "12 Points have been added to 12 users"
+    assert [len(block["fields"]) for block in blocks[2:]] == [10, 2]
+
+
+def test_large_batch_stays_within_the_block_limit_and_counts_the_rest():
+    blocks = custom_blocks.points_summary_blocks(_results(500), removed=True, link="https://example.slack.com/t/1")
+
+    assert len(blocks) == custom_blocks.MAX_MESSAGE_BLOCKS
+    assert blocks[0]["text"]["text"] == "500 Points have been removed from 500 users"
+    shown = sum(len(block.get("fields", [])) for block in blocks)
+    assert blocks[-2]["elements"][0]["text"] == f"...and {500 - shown} more"
+    assert blocks[-1]["type"] == "actions"
+
+
+def test_batch_that_just_fits_has_no_note():
+    max_fields = (custom_blocks.MAX_MESSAGE_BLOCKS - 4) * custom_blocks.MAX_SECTION_FIELDS
+
+    blocks = custom_blocks.points_summary_blocks(_results(max_fields))
+
+    assert sum(len(block.get("fields", [])) for block in blocks) == max_fields
+    assert all(block["type"] != "context" for block in blocks)
@@ -0,0 +1,140 @@
+import contextlib
+import threading
+
+from sqlalchemy import event
+
+from includes import custom_blocks, db, dispatcher
+
+
+@contextlib.contextmanager
+def statements():
+    """Collect the first word of every statement sent to the database inside the block"""
+    issued = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        issued.append(statement.split()[0].upper())
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        yield issued
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+
+
+def _instance(items):
+    db.create_checklist("deploy", "T1", "U1", items)
+    checklist = db.get_checklist_by_name("deploy", "T1")
+    return db.create_checklist_instance(checklist["id"], "C1", "1700000000.000100"), [item[0] for item in checklist["items"]]
+
+
+def _stored_completion(instance_id):
+    with db.Session() as session:
+        instance = session.get(db.ChecklistInstance, instance_id)
+        return instance.is_complete, instance.completed_at
+
+
+def test_each_toggle_is_two_updates_and_one_read():
+    instance_id, item_ids = _instance(["build", "test", "ship"])
+
+    for position, item_id in enumerate(item_ids, 1):
+        with statements() as issued:
+            instance = db.update_checklist_item(instance_id, item_id, True, "U2")
+        assert issued == ["UPDATE", "UPDATE", "SELECT"]
+        assert instance["is_complete"] == (position == len(item_ids))
+    assert instance["completed_at"] == max(item["checked_at"] for item in instance["items"])
+    assert instance["completed_at"].tzinfo is not None
+    assert [item["checked_by"] for item in instance["items"]] == ["U2"] * 3
+    assert _stored_completion(instance_id) == (1, instance["completed_at"])
+
+    with statements() as issued:
+        instance = db.update_checklist_item(instance_id, item_ids[0], False, "U2")
+    assert issued == ["UPDATE", "UPDATE", "SELECT"]
+    assert not instance["is_complete"]
+    assert instance["completed_at"] is None
+    assert [bool(item["is_checked"]) for item in instance["items"]] == [False, True, True]
+    assert _stored_completion(instance_id) == (0, None)
+
+
+def test_toggling_an_unknown_item_reads_nothing():
+    instance_id, item_ids = _instance(["build"])
+
+    with statements() as issued:
+        assert db.update_checklist_item(instance_id, max(item_ids) + 1, True, "U2") is False
+    assert issued == ["UPDATE"]
+
+
+def test_cached_template_is_reloaded_after_another_process_recreates_it(monkeypatch):
+    monkeypatch.setattr(db, "CHECKLIST_CACHE_TTL_SECONDS", 0)
+    db.create_checklist("deploy", "T1", "U1", ["build"])
+    cached = db.get_checklist_by_name("deploy", "T1")
+    assert db.get_checklist_by_name("deploy", "T1") is cached
+
+    # Another process: replaced without touching this process's cache
+    with db.Session() as session:
+        db._delete_checklist(session, "deploy", "T1")
+        db._create_checklist(session, "deploy", "T1", "U1", ["build", "ship"])
+        session.commit()
+
+    reloaded = db.get_checklist_by_name("deploy", "T1")
+    assert [text for _, text in reloaded["items"]] == ["build", "ship"]
+
+
+class UpdateRecorder:
+    """chat_update that records what it was sent; with ``hold`` each call waits for ``release``"""
+
+    def __init__(self, hold=False):
+        self.updates = []
+        self.in_flight = threading.Event()
+        self.release = threading.Event()
+        if not hold:
+            self.release.set()
+
+    def chat_update(self, channel, ts, **kwargs):
+        self.in_flight.set()
+        self.release.wait()
+        self.updates.append(kwargs)
+
+
+def _toggle(main_app, instance_id, item_id):
+    main_app.handle_item_toggle({
+        "actions": [{"action_id": f"toggle_item_{item_id}_{instance_id}", "selected_options": [{"value": "done"}]}],
+        "user": {"id": "U2"},
+        "channel": {"id": "C1"},
+        "message": {"ts": "1700000000.000100"},
+    }, client=None)
+
+
+def _latest_blocks(instance_id):
+    return custom_blocks.render_checklist_instance(db.get_checklist_instance(instance_id))
+
+
+def test_toggles_within_the_debounce_window_send_one_update_of_the_latest_state(main_app, monkeypatch):
+    client = UpdateRecorder()
+    monkeypatch.setattr(main_app, "outbox", dispatcher.MessageDispatcher(client))
+    monkeypatch.setattr(main_app, "CHECKLIST_UPDATE_DEBOUNCE_SECONDS", 0.2)
+    instance_id, item_ids = _instance(["build", "test", "ship"])
+
+    for item_id in item_ids[:2]:
+        _toggle(main_app, instance_id, item_id)
+    assert main_app.outbox.flush(timeout=10)
+
+    assert len(client.updates) == 1
+    assert client.updates[0]["blocks"] == _latest_blocks(instance_id)
+
+
+def test_toggle_during_an_update_in_flight_sends_a_follow_up(main_app, monkeypatch):
+    client = UpdateRecorder(hold=True)
+    monkeypatch.setattr(main_app, "outbox", dispatcher.MessageDispatcher(client))
+    monkeypatch.setattr(main_app, "CHECKLIST_UPDATE_DEBOUNCE_SECONDS", 0.05)
+    instance_id, item_ids = _instance(["build", "test", "ship"])
+
+    _toggle(main_app, instance_id, item_ids[0])
+    assert client.in_flight.wait(timeout=10)
+    # The update in flight was rendered before this toggle, so it cannot absorb it
+    _toggle(main_app, instance_id, item_ids[1])
+    client.release.set()
+    assert main_app.outbox.flush(timeout=10)
+
+    assert len(client.updates) == 2
+    assert client.updates[0]["blocks"] != client.updates[1]["blocks"]
+    assert client.updates[1]["blocks"] == _latest_blocks(instance_id)
@@ -0,0 +1,58 @@
+"""Slack retries of one request, delivered concurrently, must be applied once."""
+import threading
+
+import pytest
+from sqlalchemy import func, select
+
+from includes import db, dedup, metrics
+
+ADD = {"command": "/add", "text": "@bob 1", "team_id": "T1", "user_id": "U1", "channel_id": "C1",
+       "trigger_id": "trigger-1", "response_url": "https://hooks.slack.invalid/1"}
+
+
+def _deliver_concurrently(bolt, payload, deliveries):
+    start = threading.Barrier(deliveries)
+    statuses = []
+
+    def deliver(retry_num):
+        start.wait()
+        statuses.append(bolt.dispatch(payload, retry_num=retry_num or None))
+
+    workers = [threading.Thread(target=deliver, args=(i,)) for i in range(deliveries)]
+    with bolt.lazy_listeners_finished():
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return statuses
+
+
+def _ledger_rows():
+    with db.Session() as session:
+        return session.scalar(select(func.count()).select_from(db.DebitEvent))
+
+
+@pytest.mark.parametrize("use_database", [False, True], ids=["memory", "database"])
+def test_concurrent_retries_are_applied_once(bolt, monkeypatch, use_database):
+    monkeypatch.setattr(dedup, "USE_DATABASE", use_database)
+
+    statuses = _deliver_concurrently(bolt, ADD, 10)
+
+    assert statuses == [200] * 10
+    assert db.get_single_user("bob", "T1") == ("bob", 1)
+    assert _ledger_rows() == 1
+    assert metrics.snapshot()["counters"]["dedup.skipped"] == 9
+
+
+def test_database_claim_is_shared_between_processes(bolt, monkeypatch):
+    monkeypatch.setattr(dedup, "USE_DATABASE", True)
+    with bolt.lazy_listeners_finished():
+        bolt.dispatch(ADD)
+
+    # A second process has nothing in memory and must lose on the processed_requests row
+    dedup._claimed.clear()
+    with bolt.lazy_listeners_finished():
+        assert bolt.dispatch(ADD, retry_num=1) == 200
+
+    assert db.get_single_user("bob", "T1") == ("bob", 1)
+    assert _ledger_rows() == 1
@@ -0,0 +1,145 @@
+"""The outbound queue: ordering, 429 retries, coalescing and what happens when it is full."""
+import collections
+import datetime
+import threading
+import time
+
+import pytest
+from slack_sdk.errors import SlackApiError
+from slack_sdk.web.slack_response import SlackResponse
+
+from includes import db, dispatcher, metrics, scheduler
+
+
+class FakeClient:
+    """chat_postMessage that records texts per channel, answering every ``rate_limit_every``-th call with a 429"""
+
+    def __init__(self, rate_limit_every=0, release=None):
+        self.sent = collections.defaultdict(list)
+        self.calls = 0
+        self.rate_limit_every = rate_limit_every
+        self.release = release
+        self._lock = threading.Lock()
+
+    def chat_postMessage(self, channel, text, **kwargs):
+        if self.release is not None:
+            self.release.wait()
+        with self._lock:
+            self.calls += 1
+            if self.rate_limit_every and self.calls % self.rate_limit_every == 0:
+                response = SlackResponse(client=None, http_verb="POST", api_url="chat.postMessage", req_args={},
+                                         data={"ok": False, "error": "ratelimited"}, headers={"Retry-After": "0.05"},
+                                         status_code=429)
+                raise SlackApiError("ratelimited", response)
+            self.sent[channel].append(text)
+
+
+@pytest.fixture(autouse=True)
+def fast_rates(monkeypatch):
+    monkeypatch.setattr(dispatcher, "CHANNEL_RATE", (500.0, 50))
+    monkeypatch.setattr(dispatcher, "METHOD_RATES", {"chat_postMessage": (2000.0, 100)})
+
+
+def test_every_message_is_sent_in_channel_order_despite_rate_limits():
+    client = FakeClient(rate_limit_every=10)
+    outbox = dispatcher.MessageDispatcher(client, max_pending=50, workers=4)
+
+    assert all(outbox.enqueue("chat_postMessage", f"C{i % 4}", text=i) for i in range(400))
+    assert outbox.flush(timeout=30)
+
+    assert {channel: len(texts) for channel, texts in client.sent.items()} == {f"C{i}": 100 for i in range(4)}
+    assert all(texts == sorted(texts) for texts in client.sent.values())
+    assert metrics.snapshot()["counters"]["dispatcher.retried"] > 0
+
+
+def test_queued_calls_with_one_key_coalesce_into_the_latest():
+    release = threading.Event()
+    client = FakeClient(release=release)
+    outbox = dispatcher.MessageDispatcher(client, workers=1)
+
+    outbox.enqueue("chat_postMessage", "C1", text="first")
+    for i in range(20):
+        outbox.enqueue("chat_postMessage", "C1", coalesce_key="checklist", text=f"update {i}")
+    release.set()
+    assert outbox.flush(timeout=10)
+
+    assert client.sent["C1"] == ["first", "update 19"]
+    assert metrics.snapshot()["counters"]["dispatcher.coalesced"] == 19
+
+
+def test_full_queue_drops_ordinary_calls_and_holds_scheduled_ones(monkeypatch):
+    monkeypatch.setattr(dispatcher, "ENQUEUE_TIMEOUT_SECONDS", 0.1)
+    release = threading.Event()
+    client = FakeClient(release=release)
+    outbox = dispatcher.MessageDispatcher(client, max_pending=2, workers=1)
+    # One call in flight, held by the client, and two queued behind it
+    for text in ("a", "b", "c"):
+        assert outbox.enqueue("chat_postMessage", "C1", text=text)
+    while len(outbox) > 2:
+        time.sleep(0.01)
+
+    assert not outbox.enqueue("chat_postMessage", "C1", text="dropped")
+    waited = []
+    waiter = threading.Thread(
+        target=lambda: waited.append(outbox.enqueue("chat_postMessage", "C1", wait_for_room=True, text="report")))
+    waiter.start()
+    waiter.join(0.3)
+    assert waiter.is_alive()
+
+    release.set()
+    waiter.join(10)
+    assert waited == [True]
+    assert outbox.flush(timeout=10)
+    assert client.sent["C1"] == ["a", "b", "c", "report"]
+    assert metrics.snapshot()["counters"]["dispatcher.dropped"] == 1
+
+
+def test_weekly_report_that_cannot_be_queued_gives_its_week_back(main_app, monkeypatch):
+    now = datetime.datetime.now()
+    day = scheduler.WEEKDAYS[now.weekday()]
+    db.set_report_daytime("T1", day, now.hour)
+    db.record_debit("ann", "T1", 5)
+    monkeypatch.setattr(main_app, "post_to_general", lambda *args, **kwargs: False)
+    monkeypatch.setattr(main_app, "REPORT_RETRY_SECONDS", 0)
+
+    main_app.run_weekly_report("T1", day, now.hour)
+
+    assert metrics.snapshot()["counters"]["report.failed"] == 1
+    # Retried within this hour's slot rather than next week
+    assert main_app.job_scheduler.next_run("report:T1") - now < datetime.timedelta(minutes=1)
+    assert db.claim_weekly_report("T1", day, now.hour, scheduler.week_key(now))
+
+
+def test_weekly_report_is_timed_until_its_last_page_is_posted(main_app, monkeypatch):
+    now = datetime.datetime.now()
+    day = scheduler.WEEKDAYS[now.weekday()]
+    db.set_report_daytime("T1", day, now.hour)
+    db.record_debit("ann", "T1", 5)
+    release = threading.Event()
+    client = FakeClient(release=release)
+    monkeypatch.setattr(main_app, "outbox", dispatcher.MessageDispatcher(client, workers=1))
+
+    main_app.run_weekly_report("T1", day, now.hour)
+    assert "report.workspace" not in metrics.snapshot()["timings"]
+    release.set()
+    assert main_app.outbox.flush(timeout=10)
+
+    assert client.sent["debits-general"] == ["Weekly Debit Points Update"]
+    assert metrics.snapshot()["timings"]["report.workspace"]["count"] == 1
+
+
+def test_leaderboard_page_clicks_are_queued_and_coalesced(main_app, slack):
+    db.record_debits("T1", [(f"U{i}", i + 1) for i in range(105)])
+    _, _, next_page = main_app.get_leaderboard_page("T1")
+    body = {"team": {"id": "T1"}, "channel": {"id": "C1"}, "message": {"ts": "1700000000.000200"},
+            "actions": [{"value": next_page}]}
+
+    with main_app.outbox._condition:  # workers cannot take anything off the queue meanwhile
+        main_app.handle_leaderboard_page(dict(body, actions=[{"value": "1"}]), client=None)
+        main_app.handle_leaderboard_page(body, client=None)
+    assert main_app.outbox.flush(timeout=10)
+
+    assert slack.methods() == ["chat.update"]
+    # Only the later click, for the second page, is sent
+    blocks = str(slack.calls[0][1]["blocks"])
+    assert "*101. <@U4>*" in blocks and "*1. <@U104>*" not in blocks
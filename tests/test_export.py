@@ -0,0 +1,97 @@
+import csv
+import datetime
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import insert
+
+from includes import db, export
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MEMORY_CEILING_BYTES = 64 * 1024 * 1024
+
+
+def test_every_part_of_a_csv_export_starts_with_the_header():
+    db.record_debits("T1", [(f"U{i}", i) for i in range(1, 51)])
+
+    parts = list(export.iter_export("ledger", "T1", "csv", part_bytes=1024))
+
+    assert len(parts) > 1
+    header = list(export._ledger("T1").selected_columns.keys())
+    parsed = [list(csv.DictReader(part.decode().splitlines())) for part in parts]
+    assert all(part.decode().splitlines()[0] == ",".join(header) for part in parts)
+    rows = [row for part in parsed for row in part]
+    assert [(row["user"], row["delta"]) for row in rows] == [(f"U{i}", f"{i:.1f}") for i in range(1, 51)]
+
+
+def test_cli_writes_one_file(tmp_path):
+    db.record_debits("T1", [("ann", 5), ("bob", 3)])
+    output = tmp_path / "debits.ndjson"
+
+    export.main(["T1", "--dataset", "debits", "--format", "ndjson", "--output", str(output)])
+
+    lines = [json.loads(line) for line in output.read_text().splitlines()]
+    assert lines == [{"user": "ann", "amount": 5.0, "link": None}, {"user": "bob", "amount": 3.0, "link": None}]
+
+
+def test_checklist_export_carries_each_instance_completion():
+    db.create_checklist("deploy", "T1", "U1", ["build", "ship"])
+    checklist = db.get_checklist_by_name("deploy", "T1")
+    done = db.create_checklist_instance(checklist["id"], "C1", "1700000000.000100")
+    started = db.create_checklist_instance(checklist["id"], "C1", "1700000000.000200")
+    for item_id, _ in checklist["items"]:
+        instance = db.update_checklist_item(done, item_id, True, "U2")
+
+    rows = [json.loads(line) for part in export.iter_export("checklists", "T1", "ndjson") for line in part.splitlines()]
+
+    assert [(row["instance_id"], row["is_complete"]) for row in rows] == [(done, 1), (done, 1), (started, 0), (started, 0)]
+    assert {row["completed_at"] for row in rows} == {instance["completed_at"].isoformat(), None}
+
+
+# Runs the command given on its command line and prints the child's peak RSS in KiB. A child
+# starts from its parent's high-water mark, so measuring from this small process rather than
+# from the test keeps the figure about the export.
+MEASURE = """
+import os, subprocess, sys
+process = subprocess.Popen(sys.argv[1:])
+_, status, usage = os.wait4(process.pid, 0)
+print(usage.ru_maxrss)
+sys.exit(os.waitstatus_to_exitcode(status))
+"""
+
+
+def _export_peak_rss(workspace_id, output):
+    """Run the export CLI in a fresh process and return its peak resident set size in bytes"""
+    # Keep SQLite's page cache and memory map small, so the figure is the export's own memory
+    env = dict(os.environ, PYTHONPATH=ROOT, SQLITE_CACHE_SIZE="-2000", SQLITE_MMAP_SIZE="0")
+    command = [sys.executable, "-m", "includes.export", workspace_id, "--dataset", "ledger", "--output", str(output)]
+    result = subprocess.run([sys.executable, "-c", MEASURE, *command], cwd=ROOT, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    # ru_maxrss is in KiB on Linux
+    return int(result.stdout) * 1024
+
+
+@pytest.mark.slow
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads the child's peak memory with os.wait4")
+def test_exporting_a_million_rows_stays_under_the_memory_ceiling(tmp_path):
+    rows, chunk = 1_000_000, 50_000
+    ts = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    with db.engine.begin() as connection:
+        for start in range(0, rows, chunk):
+            connection.execute(insert(db.DebitEvent), [
+                {"user": f"U{i % 5000}", "workspace": "BIG", "delta": 1, "balance_after": i // 5000 + 1,
+                 "link": f"https://example.slack.com/archives/C1/p{i}", "ts": ts}
+                for i in range(start, start + chunk)
+            ])
+
+    baseline = _export_peak_rss("EMPTY", tmp_path / "empty.csv")
+    peak = _export_peak_rss("BIG", tmp_path / "big.csv")
+
+    with open(tmp_path / "big.csv", "rb") as exported:
+        lines = sum(1 for _ in exported)
+    assert lines == rows + 1
+    assert peak - baseline < MEMORY_CEILING_BYTES, f"export grew by {(peak - baseline) / 2 ** 20:.0f} MiB"
@@ -0,0 +1,76 @@
+"""The cached rankings must match user_debits whatever order concurrent writes finish in."""
+import random
+import threading
+import time
+
+import pytest
+
+from includes import db, leaderboard
+
+
+def test_sequential_writes_patch_the_cached_ranking():
+    db.record_debits("T1", [("ann", 5), ("bob", 3)])
+    db.get_leaderboard("T1", 10)
+    ranking = db.rankings.lookup("T1")[0]
+
+    db.record_debit("bob", "T1", 4)
+    db.remove_debit("ann", "T1", 5)
+
+    assert db.rankings.lookup("T1")[0] is ranking
+    assert db.get_leaderboard("T1", 10) == [("bob", 7, 1), ("ann", 0, 2)]
+
+
+def test_overlapping_writes_drop_the_entry_instead_of_applying_out_of_order():
+    rankings = leaderboard.Rankings()
+    rankings.store("T1", [("ann", 1)], 0)
+
+    # Two writes to ann in flight; the later commit (8) reports back first
+    with rankings.writing("T1") as first:
+        with rankings.writing("T1") as second:
+            second.append(("ann", 8))
+        first.append(("ann", 5))
+
+    ranking, version = rankings.lookup("T1")
+    assert ranking is None
+    # A load that started before the writes finished is not stored either
+    rankings.store("T1", [("ann", 1)], version - 1)
+    assert rankings.lookup("T1")[0] is None
+
+
+def test_failed_write_drops_the_entry():
+    rankings = leaderboard.Rankings()
+    rankings.store("T1", [("ann", 1)], 0)
+
+    with pytest.raises(RuntimeError):
+        with rankings.writing("T1"):
+            raise RuntimeError("rolled back")
+
+    assert rankings.lookup("T1")[0] is None
+
+
+def test_concurrent_writes_leave_the_cache_matching_the_database(monkeypatch):
+    # Widen the gap between each commit and its cache update so writes report back out of order
+    ranked_balances = db.ranked_balances
+    monkeypatch.setattr(db, "ranked_balances", lambda results: time.sleep(random.random() / 50) or ranked_balances(results))
+    db.record_debits("T1", [("ann", 100), ("bob", 100)])
+    start = threading.Barrier(8)
+
+    def write(i):
+        start.wait()
+        if i % 2:
+            db.record_debit("ann", "T1", i)
+        else:
+            db.remove_debit("ann", "T1", i)
+
+    for round_number in range(1, 6):
+        db.get_leaderboard("T1", 10)
+        workers = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        amount = 100 + 4 * round_number
+        assert db.get_single_user("ann", "T1") == ("ann", amount)
+        assert db.get_user_rank("ann", "T1") == ("ann", amount, 1)
+        assert db.get_leaderboard("T1", 10) == [("ann", amount, 1), ("bob", 100, 2)]
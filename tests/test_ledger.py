@@ -0,0 +1,58 @@
+"""Balances read back from the debit_events ledger at points in time."""
+import datetime
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+from includes import db, migrations
+
+START = datetime.datetime(2024, 5, 1, 12, tzinfo=datetime.timezone.utc)
+
+
+def test_balance_at_each_point_follows_adds_resets_and_removals(monkeypatch):
+    clock = [START]
+    monkeypatch.setattr(db, "utcnow", lambda: clock[0])
+
+    def at(hours, write):
+        clock[0] = START + datetime.timedelta(hours=hours)
+        write()
+
+    at(1, lambda: db.record_debit("ann", "T1", 5))
+    at(2, lambda: db.record_debit("ann", "T1", 3))
+    at(2, lambda: db.record_debit("ann", "T2", 7))
+    at(3, lambda: db.reset_debits_table("T1", actor="U1"))
+    at(4, lambda: db.record_debits("T1", [("ann", 2), ("bob", 4)]))
+    at(5, lambda: db.remove_debit("ann", "T1", 1))
+
+    def balance(hours, user_id="ann"):
+        return db.get_balance_at(user_id, "T1", START + datetime.timedelta(hours=hours))
+
+    assert [balance(hours) for hours in (0, 1, 1.5, 2, 3, 3.5, 4, 5, 6)] == [0, 5, 5, 8, 0, 0, 2, 1, 1]
+    assert [balance(hours, "bob") for hours in (2, 4)] == [0, 4]
+    # Other workspaces are not touched by T1's reset
+    assert db.get_balance_at("ann", "T2", START + datetime.timedelta(hours=3)) == 7
+    # Naive times are taken as UTC
+    assert db.get_balance_at("ann", "T1", datetime.datetime(2024, 5, 1, 14)) == 8
+
+
+def test_migration_opens_the_ledger_with_existing_balances(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE user_debits (id INTEGER PRIMARY KEY, user VARCHAR NOT NULL, amount FLOAT NOT NULL, "
+            "link VARCHAR, workspace VARCHAR NOT NULL)"
+        ))
+        connection.execute(text("INSERT INTO user_debits (user, amount, workspace) VALUES ('ann', 5, 'T1'), ('bob', 2, 'T1')"))
+    before = db.utcnow() - datetime.timedelta(seconds=1)
+
+    migrations.run_migrations(engine, db.Base.metadata)
+    after = db.utcnow() + datetime.timedelta(seconds=1)
+
+    with sessionmaker(engine)() as session:
+        opening = session.execute(select(db.DebitEvent.user, db.DebitEvent.delta, db.DebitEvent.balance_after)
+                                  .order_by(db.DebitEvent.user)).all()
+        assert opening == [("ann", 5.0, 5.0), ("bob", 2.0, 2.0)]
+        assert db._get_balance_at(session, "ann", "T1", before) == 0
+        assert db._get_balance_at(session, "ann", "T1", after) == 5
+        assert db._get_balance_at(session, "bob", "T1", after) == 2
+    engine.dispose()
@@ -0,0 +1,29 @@
+import logging
+
+from includes import db, metrics, user_profiles
+
+
+def test_snapshot_reports_every_named_cache():
+    db.record_debit("ann", "T1", 5)
+    db.get_leaderboard("T1", 10)
+    db.get_leaderboard("T1", 10)
+
+    caches = metrics.snapshot()["caches"]
+    assert {"dedup", "user_profiles", "checklist_templates", "leaderboard"} <= set(caches)
+    assert caches["leaderboard"] == db.rankings.stats()
+    assert caches["user_profiles"] == user_profiles.stats()
+    assert caches["checklist_templates"] == db.checklist_templates.stats()
+
+
+def test_scheduler_logs_a_summary_and_rearms(main_app, caplog):
+    metrics.increment("dispatcher.sent", 3)
+    metrics.observe("ack./add", 0.25)
+
+    with caplog.at_level(logging.INFO):
+        main_app.log_metrics()
+
+    assert main_app.job_scheduler.next_run("log_metrics") is not None
+    summary = caplog.text
+    assert "dispatcher.sent: 3" in summary
+    assert "ack./add: n=1 avg=250.0ms" in summary
+    assert "cache checklist_templates: size=0" in summary
@@ -0,0 +1,111 @@
+import datetime
+import os
+import subprocess
+import sys
+import time
+
+from sqlalchemy import create_engine, inspect, select, text
+
+from includes import db, migrations
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# A replica: wait for the common start time, then import includes.db, which migrates
+REPLICA = """
+import sys, time
+time.sleep(max(0, float(sys.argv[1]) - time.time()))
+from includes import db
+print(db.migrations.get_schema_version(db.engine.connect()))
+"""
+
+
+def _start_replicas(path, count):
+    env = dict(os.environ, SQLITE_PATH=str(path), PYTHONPATH=ROOT)
+    env.pop("DATABASE_URL", None)
+    start = time.time() + 2
+    return [
+        subprocess.Popen([sys.executable, "-c", REPLICA, str(start)], cwd=ROOT, env=env,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        for _ in range(count)
+    ]
+
+
+def test_replicas_starting_together_apply_each_migration_once(tmp_path):
+    path = tmp_path / "replicas.db"
+    latest = migrations.MIGRATIONS[-1][0]
+
+    replicas = _start_replicas(path, 6)
+    outputs = [replica.communicate(timeout=120) for replica in replicas]
+
+    for replica, (stdout, stderr) in zip(replicas, outputs):
+        assert replica.returncode == 0, stderr
+        assert stdout.split() == [str(latest)]
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.connect() as connection:
+        versions = connection.execute(text("SELECT version FROM schema_version ORDER BY version")).scalars().all()
+    engine.dispose()
+    assert versions == [version for version, _ in migrations.MIGRATIONS]
+
+
+# Checklist tables as the first release created them, with isoformat() strings in local time
+OLD_CHECKLIST_TABLES = [
+    "CREATE TABLE checklists (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, workspace VARCHAR NOT NULL, "
+    "creator VARCHAR NOT NULL, created_at VARCHAR NOT NULL)",
+    "CREATE TABLE checklist_items (id INTEGER PRIMARY KEY, checklist_id INTEGER NOT NULL, text VARCHAR NOT NULL, "
+    '"order" INTEGER NOT NULL)',
+    "CREATE TABLE checklist_instances (id INTEGER PRIMARY KEY, checklist_id INTEGER NOT NULL, channel VARCHAR NOT NULL, "
+    "message_ts VARCHAR NOT NULL, created_at VARCHAR NOT NULL, completed_at VARCHAR, is_complete INTEGER)",
+    "CREATE TABLE checklist_item_status (id INTEGER PRIMARY KEY, instance_id INTEGER NOT NULL, item_id INTEGER NOT NULL, "
+    "is_checked INTEGER, checked_by VARCHAR, checked_at VARCHAR)",
+]
+CREATED, CHECKED = "2024-03-09T17:45:12.345678", "2024-03-10T08:05:00.000001"
+
+
+def test_old_database_is_upgraded(tmp_path):
+    # A debits.db from before the migration runner: tables without indexes, duplicate balances
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE user_debits (id INTEGER PRIMARY KEY, user VARCHAR NOT NULL, amount FLOAT NOT NULL, "
+            "link VARCHAR, workspace VARCHAR NOT NULL)"
+        ))
+        connection.execute(text(
+            "INSERT INTO user_debits (user, amount, workspace) VALUES ('ann', 2, 'T1'), ('ann', 3, 'T1'), ('bob', 1, 'T1')"
+        ))
+        for statement in OLD_CHECKLIST_TABLES:
+            connection.execute(text(statement))
+        connection.execute(text(
+            "INSERT INTO checklists (id, name, workspace, creator, created_at) VALUES (1, 'deploy', 'T1', 'U1', :created)"
+        ), {"created": CREATED})
+        connection.execute(text("INSERT INTO checklist_items (id, checklist_id, text, \"order\") VALUES (1, 1, 'ship', 0)"))
+        connection.execute(text(
+            "INSERT INTO checklist_instances (id, checklist_id, channel, message_ts, created_at, completed_at, is_complete) "
+            "VALUES (1, 1, 'C1', '1700000000.000100', :created, :checked, 1)"
+        ), {"created": CREATED, "checked": CHECKED})
+        connection.execute(text(
+            "INSERT INTO checklist_item_status (id, instance_id, item_id, is_checked, checked_by, checked_at) "
+            "VALUES (1, 1, 1, 1, 'U2', :checked)"
+        ), {"checked": CHECKED})
+
+    assert migrations.run_migrations(engine, db.Base.metadata) == migrations.MIGRATIONS[-1][0]
+    with engine.connect() as connection:
+        balances = connection.execute(text('SELECT "user", amount FROM user_debits ORDER BY "user"')).all()
+        indexes = {index["name"] for index in inspect(connection).get_indexes("user_debits")}
+        timestamps = connection.execute(select(
+            db.Checklist.created_at, db.ChecklistInstance.created_at, db.ChecklistInstance.completed_at,
+            db.ChecklistItemStatus.checked_at,
+        ).select_from(db.Checklist).join(
+            db.ChecklistInstance, db.ChecklistInstance.checklist_id == db.Checklist.id
+        ).join(
+            db.ChecklistItemStatus, db.ChecklistItemStatus.instance_id == db.ChecklistInstance.id
+        )).one()
+    # Running again on an up-to-date database is a no-op
+    assert migrations.run_migrations(engine, db.Base.metadata) == migrations.MIGRATIONS[-1][0]
+    engine.dispose()
+
+    assert balances == [("ann", 5.0), ("bob", 1.0)]
+    assert {"uq_user_debits_user_workspace", "ix_user_debits_workspace_amount"} <= indexes
+    # Read back as the same instants, now tagged as UTC
+    created, checked = (datetime.datetime.fromisoformat(value).astimezone() for value in (CREATED, CHECKED))
+    assert tuple(timestamps) == (created, created, checked, checked)
+    assert all(value.utcoffset() == datetime.timedelta(0) for value in timestamps)
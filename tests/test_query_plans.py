@@ -0,0 +1,109 @@
+"""Every statement issued by includes/db.py must be answered from an index (SQLite only)."""
+import datetime
+import inspect
+import re
+
+import pytest
+from sqlalchemy import event
+
+from includes import db
+
+pytestmark = pytest.mark.skipif(db.engine.dialect.name != "sqlite", reason="EXPLAIN QUERY PLAN is SQLite syntax")
+
+# Read every row of their table on purpose: the scheduler loads all workspaces at once
+FULL_TABLE_READS = {"get_report_daytime", "get_reset_mode"}
+
+# Public functions of includes/db.py that issue no queries of their own
+NOT_QUERIES = {
+    "create_db_engine", "pool_options", "sqlite_pragmas", "install_sqlite_pragmas", "utcnow",
+    "upsert_insert", "ranked_balances", "cached_checklist", "invalidate_checklist",
+}
+
+
+def _checklist_ids():
+    checklist = db.get_checklist_by_name("deploy", "T1")
+    instance_id = db.create_checklist_instance(checklist["id"], "C1", "1.1")
+    return instance_id, checklist["items"][0][0]
+
+
+# One call per query function, run in order against the same data
+QUERIES = [
+    ("record_debits", lambda: db.record_debits("T1", [("ann", 5), ("bob", 3)], actor="U1")),
+    ("record_debit", lambda: db.record_debit("cat", "T1", 2)),
+    ("remove_debits", lambda: db.remove_debits("T1", [("ann", 1), ("bob", 10)])),
+    ("remove_debit", lambda: db.remove_debit("cat", "T1", 1)),
+    ("get_single_user", lambda: db.get_single_user("ann", "T1")),
+    ("get_leaderboard", lambda: db.get_leaderboard("T1", 10)),
+    ("get_user_rank", lambda: db.get_user_rank("ann", "T1")),
+    ("get_balance_at", lambda: db.get_balance_at("ann", "T1", datetime.datetime.now(datetime.timezone.utc))),
+    ("set_reset_mode", lambda: db.set_reset_mode("T1", "automatic")),
+    ("get_reset_mode", db.get_reset_mode),
+    ("reset_debits_for_period", lambda: db.reset_debits_for_period("T1", "2999-01")),
+    ("reset_debits_table", lambda: db.reset_debits_table("T1")),
+    ("set_report_daytime", lambda: db.set_report_daytime("T1", "monday", 9)),
+    ("get_report_daytime", db.get_report_daytime),
+    ("get_report_schedule", lambda: db.get_report_schedule("T1")),
+    ("claim_weekly_report", lambda: db.claim_weekly_report("T1", "monday", 9, "2999-W01")),
+    ("release_weekly_report", lambda: db.release_weekly_report("T1", "2999-W01")),
+    ("create_checklist", lambda: db.create_checklist("deploy", "T1", "U1", ["build", "ship"])),
+    ("get_checklist_by_name", lambda: db.get_checklist_by_name("deploy", "T1")),
+    ("get_all_checklists", lambda: db.get_all_checklists("T1")),
+    ("create_checklist_instance", lambda: db.create_checklist_instance(
+        db.get_checklist_by_name("deploy", "T1")["id"], "C1", "temp")),
+    ("set_checklist_instance_message_ts", lambda: db.set_checklist_instance_message_ts(1, "1.2")),
+    ("update_checklist_item", lambda: db.update_checklist_item(*_checklist_ids(), True, "U1")),
+    ("get_checklist_instance", lambda: db.get_checklist_instance(1)),
+    ("delete_checklist", lambda: db.delete_checklist("deploy", "T1")),
+    ("claim_request", lambda: db.claim_request("trigger:1", 60)),
+    ("purge_processed_requests", lambda: db.purge_processed_requests(60)),
+]
+
+
+def _run_all():
+    """Run QUERIES and return {name: [(statement, parameters), ...]}"""
+    captured = {}
+    current = []
+
+    def capture(connection, cursor, statement, parameters, context, executemany):
+        current.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        for name, call in QUERIES:
+            current.clear()
+            db.checklist_templates.clear()
+            call()
+            captured[name] = list(current)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+    return captured
+
+
+def _table_scans(statement, parameters) -> list:
+    with db.engine.connect() as connection:
+        plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    # "SCAN user_debits" reads the whole table; subqueries show up as "SCAN (subquery-1)"
+    return [row[-1] for row in plan if re.match(r"SCAN (TABLE )?\w+", row[-1]) and "CONSTANT ROW" not in row[-1]]
+
+
+def test_every_query_function_is_exercised():
+    public = {
+        name for name, function in inspect.getmembers(db, inspect.isfunction)
+        if function.__module__ == db.__name__ and not name.startswith("_")
+    }
+    assert public - NOT_QUERIES == {name for name, _ in QUERIES}
+
+
+def test_every_query_uses_an_index():
+    captured = _run_all()
+    scans = {}
+    for name, statements in captured.items():
+        assert statements or name in ("get_leaderboard", "get_user_rank"), f"{name} issued no statement"
+        if name in FULL_TABLE_READS:
+            continue
+        for statement, parameters in statements:
+            if statement.lstrip().upper().startswith(("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")):
+                found = _table_scans(statement, parameters)
+                if found:
+                    scans.setdefault(name, []).append((" ".join(statement.split()), found))
+    assert not scans, scans
@@ -0,0 +1,83 @@
+"""Monthly automatic resets: one winner per period, and no reset for balances kept in manual mode."""
+import asyncio
+import datetime
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+from sqlalchemy import update
+
+from includes import async_db, db, scheduler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THIS_MONTH = scheduler.month_key(datetime.datetime.now())
+NEXT_MONTH = scheduler.month_key(datetime.datetime.now().replace(day=1) + datetime.timedelta(days=32))
+
+# Another replica's scheduler: reset the period given on the command line
+SCHEDULER = """
+import sys
+from includes import db
+print(db.reset_debits_for_period("T1", sys.argv[1]))
+"""
+
+
+def _set_reset_mode_async(workspace_id, mode):
+    async def set_and_dispose():
+        await async_db.set_reset_mode(workspace_id, mode)
+        await async_db.async_engine.dispose()
+
+    asyncio.run(set_and_dispose())
+
+
+@pytest.mark.parametrize("set_reset_mode", [db.set_reset_mode, _set_reset_mode_async], ids=["sync", "async"])
+def test_switching_back_to_automatic_waits_for_next_month(set_reset_mode):
+    set_reset_mode("T1", "automatic")
+    # Automatic since June, then manual for a while
+    with db.Session() as session:
+        session.execute(update(db.ResetMode).values(last_reset_period="2026-06"))
+        session.commit()
+    set_reset_mode("T1", "manual")
+    db.record_debit("ann", "T1", 5)
+
+    set_reset_mode("T1", "automatic")
+
+    assert not db.reset_debits_for_period("T1", THIS_MONTH)
+    assert db.get_single_user("ann", "T1") == ("ann", 5)
+    assert db.reset_debits_for_period("T1", NEXT_MONTH)
+    assert db.get_single_user("ann", "T1") == (None, None)
+
+
+def test_staying_automatic_keeps_the_period():
+    db.set_reset_mode("T1", "automatic")
+    assert db.reset_debits_for_period("T1", NEXT_MONTH)
+    db.set_reset_mode("T1", "automatic")
+
+    (reset_mode,) = db.get_reset_mode()
+    assert reset_mode.last_reset_period == NEXT_MONTH
+
+
+def test_racing_schedulers_reset_once_per_period():
+    db.set_reset_mode("T1", "automatic")
+    db.record_debit("ann", "T1", 5)
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(db.reset_debits_for_period("T1", NEXT_MONTH)))
+               for _ in range(8)]
+    replicas = [
+        subprocess.Popen([sys.executable, "-c", SCHEDULER, NEXT_MONTH], cwd=ROOT,
+                         env=dict(os.environ, PYTHONPATH=ROOT), stdout=subprocess.PIPE, text=True)
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results += [replica.communicate(timeout=60)[0].split()[-1] == "True" for replica in replicas]
+
+    assert results.count(True) == 1
+    assert db.get_single_user("ann", "T1") == (None, None)
+    with db.Session() as session:
+        markers = session.query(db.DebitEvent).filter_by(workspace="T1", user=None).count()
+    assert markers == 1
@@ -0,0 +1,73 @@
+"""When weekly reports fall due, and that each week's report is posted once."""
+import datetime
+import threading
+
+from includes import db, scheduler
+
+MONDAY = datetime.datetime(2024, 1, 8)
+
+
+def test_start_inside_the_open_hour_slot_fires_now():
+    now = MONDAY.replace(hour=9, minute=30)
+
+    assert scheduler.next_weekly_run("monday", 9, now) == now
+    assert scheduler.next_weekly_run("Monday", 10, now) == MONDAY.replace(hour=10)
+    assert scheduler.next_weekly_run("wednesday", 9, now) == datetime.datetime(2024, 1, 10, 9)
+
+
+def test_rearming_an_hour_after_the_run_moves_it_to_next_week():
+    ran_at = MONDAY.replace(hour=9, minute=59)
+
+    assert scheduler.next_weekly_run("monday", 9, ran_at + datetime.timedelta(hours=1)) == datetime.datetime(2024, 1, 15, 9)
+    # Even a run right at the start of the slot is not repeated within it
+    assert scheduler.next_weekly_run("monday", 9, MONDAY.replace(hour=10)) == datetime.datetime(2024, 1, 15, 9)
+
+
+def test_week_keys_order_across_a_year_boundary():
+    days = [datetime.datetime(2020, 12, 21) + datetime.timedelta(days=7 * i) for i in range(4)]
+    keys = [scheduler.week_key(day) for day in days]
+
+    assert keys == ["2020-W52", "2020-W53", "2021-W01", "2021-W02"]
+    assert sorted(keys) == keys
+    # The last days of December can belong to the next ISO year
+    assert scheduler.week_key(datetime.datetime(2024, 12, 30)) == "2025-W01"
+    assert scheduler.week_key(datetime.datetime(2024, 12, 30)) > scheduler.week_key(datetime.datetime(2024, 12, 29))
+
+
+def _schedule_report_now(main_app):
+    now = datetime.datetime.now()
+    day = scheduler.WEEKDAYS[now.weekday()]
+    db.set_report_daytime("T1", day, now.hour)
+    db.record_debit("ann", "T1", 5)
+    return day, now.hour
+
+
+def test_second_run_in_the_same_week_does_not_post_again(main_app, slack):
+    day, hour = _schedule_report_now(main_app)
+
+    main_app.run_weekly_report("T1", day, hour)
+    # What a restarted process would do when it re-arms the same slot
+    main_app.report_schedules.clear()
+    main_app.run_weekly_report("T1", day, hour)
+    assert main_app.outbox.flush(timeout=10)
+
+    assert slack.methods().count("chat.postMessage") == 1
+    assert main_app.job_scheduler.next_run("report:T1") - datetime.datetime.now() > datetime.timedelta(days=6)
+
+
+def test_concurrent_runs_of_one_week_post_once(main_app, slack):
+    day, hour = _schedule_report_now(main_app)
+    start = threading.Barrier(4)
+
+    def run():
+        start.wait()
+        main_app.run_weekly_report("T1", day, hour)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert main_app.outbox.flush(timeout=10)
+
+    assert slack.methods().count("chat.postMessage") == 1